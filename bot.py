@@ -25,10 +25,11 @@ from datetime import datetime
 import pytz
 
 from hydrogram import Client, filters
-from aiohttp import web
 
-from web import web_app
-from info import API_ID, API_HASH, BOT_TOKEN, PORT, LOG_CHANNEL, ADMINS
+from web import start_web_server
+from web.utils.session_pool import media_pool
+from web.utils.render_template import build_static_pages
+from info import API_ID, API_HASH, BOT_TOKEN, PORT, LOG_CHANNEL, ADMINS, WEB_MODE
 
 from utils import (
     temp,
@@ -37,7 +38,10 @@ from utils import (
 )
 
 from database.users_chats_db import db
-# ❌ REMOVED: from plugins.banned import auto_unban_worker
+from database.entitlements import entitlements
+from database.user_registry import user_registry
+from database.ban_registry import ban_registry
+from plugins.tools import close_upload_session
 
 
 # ==========================
@@ -61,48 +65,36 @@ async def check_and_remove_expired_premium(client):
     
     while True:
         try:
-            users = await db.get_premium_users()
             now = datetime.utcnow()
             removed_count = 0
             
-            for user in users:
+            # Only plans already past plan.expire (indexed range)
+            async for user in db.iter_premium_users({"id": 1, "_id": 0}, before=now):
                 try:
-                    plan = user.get("plan", {})
-                    expire = plan.get("expire")
-                    
-                    if not expire:
+                    uid = user.get("id")
+                    if not uid:
                         continue
+
+                    # Remove premium status
+                    await db.update_plan(uid, {
+                        "premium": False,
+                        "plan": None,
+                        "expire": None
+                    })
                     
-                    # Convert to datetime
-                    if isinstance(expire, (int, float)):
-                        exp_dt = datetime.utcfromtimestamp(expire)
-                    else:
-                        exp_dt = expire
+                    removed_count += 1
+                    logger.info(f"✅ Removed expired premium for user {uid}")
                     
-                    # Check if expired
-                    if exp_dt <= now:
-                        uid = user.get("_id") or user.get("id")
-                        
-                        # Remove premium status
-                        await db.update_plan(uid, {
-                            "premium": False,
-                            "plan": None,
-                            "expire": None
-                        })
-                        
-                        removed_count += 1
-                        logger.info(f"✅ Removed expired premium for user {uid}")
-                        
-                        # Optional: Notify user
-                        try:
-                            await client.send_message(
-                                uid,
-                                "⚠️ **Premium Expired**\n\n"
-                                "Your premium subscription has ended.\n"
-                                "Use /plan to renew and continue enjoying premium benefits!"
-                            )
-                        except Exception as e:
-                            logger.debug(f"Could not notify user {uid}: {e}")
+                    # Optional: Notify user
+                    try:
+                        await client.send_message(
+                            uid,
+                            "⚠️ **Premium Expired**\n\n"
+                            "Your premium subscription has ended.\n"
+                            "Use /plan to renew and continue enjoying premium benefits!"
+                        )
+                    except Exception as e:
+                        logger.debug(f"Could not notify user {uid}: {e}")
                 
                 except Exception as e:
                     logger.error(f"Error processing user premium expiry: {e}")
@@ -145,6 +137,12 @@ class Bot(Client):
         )
 
     async def start(self):
+        # ---- database (async client: ping + indexes) ----
+        await db.init()
+        await entitlements.load()
+        await ban_registry.load()
+        temp.BANNED_USERS = ban_registry.banned
+
         await super().start()
 
         # ---- runtime globals ----
@@ -168,14 +166,14 @@ class Bot(Client):
         temp.U_NAME = me.username
         temp.B_NAME = me.first_name
 
-        # ---- web server ----
-        runner = web.AppRunner(web_app)
-        await runner.setup()
-        await web.TCPSite(
-            runner,
-            host="0.0.0.0",
-            port=PORT
-        ).start()
+        # ---- web streamer (skip when stream.py runs it) ----
+        if WEB_MODE == "combined":
+            build_static_pages()
+            asyncio.create_task(media_pool.start(self))
+            await start_web_server(PORT)
+        else:
+            media_pool.attach(self)  # /upload still reads files through media sessions
+            logger.info("🌐 WEB_MODE=bot: streamer runs in its own process")
 
         # ==========================
         # 🔁 BACKGROUND TASKS
@@ -184,6 +182,9 @@ class Bot(Client):
         # 🔥 FILE MEMORY LEAK GUARD
         asyncio.create_task(cleanup_files_memory())
 
+        # 👥 USER REGISTRY (batched upserts of new users)
+        asyncio.create_task(user_registry.worker())
+
         # 🔔 PREMIUM EXPIRY REMINDER
         asyncio.create_task(premium_expiry_reminder(self))
 
@@ -221,6 +222,9 @@ class Bot(Client):
         logger.info(f"Bot @{me.username} started successfully")
 
     async def stop(self, *args):
+        await user_registry.flush()
+        await media_pool.stop()
+        await close_upload_session()
         await super().stop()
         logger.info("Bot stopped cleanly")
 
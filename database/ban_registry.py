@@ -0,0 +1,81 @@
+import heapq
+from datetime import datetime
+
+from database.users_chats_db import db
+
+
+# =========================
+# 🚫 IN-MEMORY BAN REGISTRY
+# =========================
+class BanRegistry:
+    """
+    Every active ban in RAM: `banned` is the O(1) membership set
+    (shared as temp.BANNED_USERS), `bans` holds user_id -> (until, reason).
+    Expiry pops a min-heap of (until, user_id); the TTL index on
+    bans.until drops the same rows server side.
+    """
+
+    def __init__(self):
+        self.banned = set()
+        self.bans = {}
+        self.heap = []
+        self.dropped = 0
+
+    async def load(self):
+        bans, heap = {}, []
+        async for ban in db.iter_banned_users():
+            uid, until = ban.get("id"), ban.get("until")
+            if uid and isinstance(until, datetime):
+                bans[uid] = (until, ban.get("reason", ""))
+                heap.append((until, uid))
+
+        heapq.heapify(heap)
+        self.bans, self.heap = bans, heap
+        self.banned.clear()
+        self.banned.update(bans)
+        print(f"[INFO] ✅ Ban registry loaded: {len(bans)} banned users")
+
+    def apply(self, user_id: int, until, reason: str = ""):
+        """Write-through hook for db.ban_user / db.unban_user"""
+        if until is None:
+            self.bans.pop(user_id, None)
+            self.banned.discard(user_id)
+            return
+
+        self.bans[user_id] = (until, reason)
+        self.banned.add(user_id)
+        # the old heap entry (if any) goes stale and is skipped on pop
+        heapq.heappush(self.heap, (until, user_id))
+
+    def expire(self):
+        """Lift every ban whose `until` has passed"""
+        now = datetime.utcnow()
+        while self.heap and self.heap[0][0] <= now:
+            until, uid = heapq.heappop(self.heap)
+            entry = self.bans.get(uid)
+            if entry and entry[0] == until:
+                del self.bans[uid]
+                self.banned.discard(uid)
+
+    # -------------------------
+    # 🔍 LOOKUPS (O(1), no DB)
+    # -------------------------
+    def is_banned(self, user_id: int) -> bool:
+        if self.heap and self.heap[0][0] <= datetime.utcnow():
+            self.expire()
+        return user_id in self.banned
+
+    def status(self, user_id: int) -> dict:
+        """Same shape as db.get_ban_status"""
+        if not self.is_banned(user_id):
+            return {"status": False}
+
+        until, reason = self.bans[user_id]
+        return {"status": True, "reason": reason, "until": until}
+
+    def stats(self) -> dict:
+        return {"banned": len(self.banned), "heap": len(self.heap), "dropped": self.dropped}
+
+
+ban_registry = BanRegistry()
+db.ban_listeners.append(ban_registry.apply)
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+from info import ADMINS
+from database.users_chats_db import db
+
+
+# =========================
+# ⚙️ CONFIG
+# =========================
+GRACE_PERIOD = timedelta(minutes=30)
+
+
+def to_datetime(expire):
+    """plan.expire (timestamp or datetime) -> naive UTC datetime"""
+    if isinstance(expire, (int, float)):
+        return datetime.utcfromtimestamp(expire)
+    if isinstance(expire, datetime):
+        return expire
+    return None
+
+
+# =========================
+# 💎 ENTITLEMENT STORE
+# =========================
+class EntitlementStore:
+    """
+    Every active premium plan in RAM: user_id -> (expire, plan name).
+    Loaded once at startup; db.update_plan pushes every write here,
+    so premium checks never touch the database.
+    """
+
+    def __init__(self):
+        self.plans = {}
+        self.lookups = 0
+
+    async def load(self):
+        plans = {}
+        async for user in db.iter_premium_users():
+            uid = user.get("id")
+            plan = user.get("plan") or {}
+            expire = to_datetime(plan.get("expire"))
+            if uid and expire:
+                plans[uid] = (expire, plan.get("plan"))
+
+        self.plans = plans
+        print(f"[INFO] ✅ Entitlements loaded: {len(plans)} premium users")
+
+    def apply(self, user_id: int, plan: dict):
+        """Write-through hook for db.update_plan"""
+        expire = to_datetime((plan or {}).get("expire"))
+        if plan and plan.get("premium") and expire:
+            self.plans[user_id] = (expire, plan.get("plan"))
+        else:
+            self.plans.pop(user_id, None)
+
+    # -------------------------
+    # 🔍 LOOKUPS (O(1), no DB)
+    # -------------------------
+    def get(self, user_id: int):
+        """(expire, plan name) or None"""
+        self.lookups += 1
+        return self.plans.get(user_id)
+
+    def is_active(self, user_id: int, grace: bool = True) -> bool:
+        entry = self.get(user_id)
+        if not entry:
+            return False
+
+        limit = entry[0] + GRACE_PERIOD if grace else entry[0]
+        return datetime.utcnow() <= limit
+
+    def has_access(self, user_id: int) -> bool:
+        """Admins, or premium within the grace period"""
+        return user_id in ADMINS or self.is_active(user_id)
+
+    def stats(self) -> dict:
+        return {"premium_users": len(self.plans), "lookups": self.lookups}
+
+
+entitlements = EntitlementStore()
+db.plan_listeners.append(entitlements.apply)
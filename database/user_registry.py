@@ -0,0 +1,88 @@
+import asyncio
+
+from database.users_chats_db import db
+
+
+# =========================
+# ⚙️ CONFIG
+# =========================
+FLUSH_INTERVAL = 10     # seconds between batched upserts
+FLUSH_BATCH = 500       # flush early once this many new users are waiting
+
+
+# =========================
+# 👥 WRITE-BEHIND USER REGISTRY
+# =========================
+class UserRegistry:
+    """
+    Records every user the handlers see.
+    Known ids live in a RAM set, so the hot path is one set lookup;
+    new users are queued and upserted in batches by a background task.
+    """
+
+    def __init__(self):
+        self.known = set()
+        self.pending = {}       # user_id -> name
+        self.registered = 0
+        self._wake = asyncio.Event()
+
+    def seen(self, user_id: int, name: str = ""):
+        if user_id in self.known or user_id in self.pending:
+            return
+        self.pending[user_id] = name or ""
+        if len(self.pending) >= FLUSH_BATCH:
+            self._wake.set()
+
+    def forget(self, user_id: int):
+        """Listener for db.delete_user: re-register if they come back"""
+        self.known.discard(user_id)
+
+    async def load(self):
+        known = set()
+        async for user_id in db.iter_user_ids():
+            known.add(user_id)
+        self.known |= known
+        print(f"[INFO] ✅ User registry loaded: {len(self.known)} users")
+
+    async def flush(self):
+        if not self.pending:
+            return 0
+
+        batch, self.pending = self.pending, {}
+        try:
+            added = await db.add_users_bulk(batch)
+        except Exception as e:
+            print(f"[ERROR] User registry flush failed ({len(batch)} users): {e}")
+            # keep them for the next round
+            batch.update(self.pending)
+            self.pending = batch
+            return 0
+
+        self.known.update(batch)
+        self.registered += added
+        return added
+
+    async def worker(self):
+        try:
+            await self.load()
+        except Exception as e:
+            print(f"[ERROR] User registry load failed: {e}")
+
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "known": len(self.known),
+            "pending": len(self.pending),
+            "registered": self.registered,
+        }
+
+
+user_registry = UserRegistry()
+db.delete_listeners.append(user_registry.forget)
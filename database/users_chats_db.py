@@ -1,7 +1,8 @@
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, UpdateOne
 from datetime import datetime
+from collections import defaultdict, OrderedDict
+import copy
 import time
-import asyncio
 from functools import wraps
 
 from info import (
@@ -9,37 +10,72 @@ from info import (
     ADMINS,
     DATABASE_NAME,
     DATA_DATABASE_URL,
+    DATABASE_POOL_SIZE,
+    DATABASE_MIN_POOL,
     VERIFY_EXPIRE
 )
 
 # =========================
-# 🔗 MongoDB Connection
+# 🔗 MongoDB Connection (async, lazy)
 # =========================
-try:
-    client = MongoClient(
-        DATA_DATABASE_URL,
-        serverSelectionTimeoutMS=5000,
-        connectTimeoutMS=10000,
-        socketTimeoutMS=10000,
-        maxPoolSize=50,
-        retryWrites=True
-    )
-    client.server_info()
-    dbase = client[DATABASE_NAME]
-    print("✅ Database connected successfully")
-except Exception as e:
-    print(f"❌ Database connection failed: {e}")
-    dbase = None
+# Sockets open on first use inside the running loop; Database.init() pings.
+client = AsyncMongoClient(
+    DATA_DATABASE_URL,
+    serverSelectionTimeoutMS=5000,
+    connectTimeoutMS=10000,
+    socketTimeoutMS=10000,
+    maxPoolSize=DATABASE_POOL_SIZE,
+    minPoolSize=DATABASE_MIN_POOL,
+    retryWrites=True
+)
+dbase = client[DATABASE_NAME]
+
+
+# =========================
+# ⚙️ Settings Cache
+# =========================
+SETTINGS_TTL = 300          # seconds before a group's settings are re-read
+SETTINGS_CACHE_SIZE = 5000  # groups kept (LRU)
 
 
 # =========================
-# 🛡️ Async Wrapper
+# 💎 Premium Projection
 # =========================
-def run_sync(func):
+# Fields the sweeps and panels read; skips the invoice history
+PLAN_SUMMARY = {
+    "_id": 0,
+    "id": 1,
+    "plan.premium": 1,
+    "plan.plan": 1,
+    "plan.expire": 1,
+    "plan.last_reminder": 1,
+}
+
+
+# =========================
+# ⏱️ Per-Method Latency
+# =========================
+DB_LATENCY = defaultdict(lambda: {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+
+
+def timed(func):
+    name = func.__name__
+
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            DB_LATENCY[name]["errors"] += 1
+            raise
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            stat = DB_LATENCY[name]
+            stat["calls"] += 1
+            stat["total_ms"] += ms
+            if ms > stat["max_ms"]:
+                stat["max_ms"] = ms
     return wrapper
 
 
@@ -66,7 +102,6 @@ class Database:
         "premium": False,
         "plan": "free",
         "expire": None,
-        "invoices": [],
         "last_reminder": None,
         "activated_at": None,
     }
@@ -80,70 +115,232 @@ class Database:
     # INIT
     # =========================
     def __init__(self):
-        if dbase is None:
-            raise Exception("Database not connected")
-
         self.users = dbase.users
         self.groups = dbase.groups
         self.premium = dbase.premium
+        self.invoices = dbase.invoices
         self.reminders = dbase.reminders
         self.bans = dbase.bans
         self.warns = dbase.warns
-
-        self._create_indexes()
-
-    def _create_indexes(self):
+        self.stream_links = dbase.stream_links
+
+        # called as listener(user_id, plan) after every plan write
+        self.plan_listeners = []
+        # called as listener(user_id, until or None, reason) on ban/unban
+        self.ban_listeners = []
+        # called as listener(user_id) after a user is deleted
+        self.delete_listeners = []
+
+        # chat_id -> (settings, loaded_at); callers always get a copy
+        self.settings_cache = OrderedDict()
+        self.settings_hits = 0
+        self.settings_misses = 0
+
+    async def init(self):
+        """Ping the server and ensure indexes (call once from bot start)"""
+        try:
+            await client.admin.command("ping")
+            print("✅ Database connected successfully")
+        except Exception as e:
+            print(f"❌ Database connection failed: {e}")
+            raise
+
+        await self._normalize_plan_expiry()
+        await self._migrate_invoices()
+        await self._create_indexes()
+        await self._ensure_ban_ttl()
+
+    async def _normalize_plan_expiry(self):
+        """One-off: plan.expire used to be a float timestamp; store Dates only"""
         try:
-            self.users.create_index("id", unique=True)
-            self.groups.create_index("id", unique=True)
-            self.bans.create_index("id")
-            self.bans.create_index("until")
-            self.warns.create_index([("user_id", 1), ("chat_id", 1)])
-            self.premium.create_index("id", unique=True)
-            self.reminders.create_index([("sent", 1), ("remind_at", 1)])
+            result = await self.premium.update_many(
+                {"plan.expire": {"$type": "number"}},
+                [{"$set": {"plan.expire": {"$toDate": {"$multiply": ["$plan.expire", 1000]}}}}]
+            )
+            if result.modified_count:
+                print(f"[INFO] Converted {result.modified_count} plan.expire timestamps to dates")
+        except Exception as e:
+            print(f"[WARN] plan.expire migration failed: {e}")
+
+    async def _migrate_invoices(self):
+        """One-off: move plan.invoices arrays into the invoices collection"""
+        moved = 0
+        try:
+            cursor = self.premium.find(
+                {"plan.invoices.0": {"$exists": True}},
+                {"_id": 0, "id": 1, "plan.invoices": 1}
+            ).batch_size(200)
+            async for doc in cursor:
+                uid = doc["id"]
+                ops = [
+                    UpdateOne(
+                        {"user_id": uid, "id": inv.get("id")},
+                        {"$setOnInsert": {**inv, "user_id": uid}},
+                        upsert=True
+                    )
+                    for inv in doc["plan"]["invoices"]
+                ]
+                await self.invoices.bulk_write(ops, ordered=False)
+                await self.premium.update_one({"id": uid}, {"$unset": {"plan.invoices": ""}})
+                moved += len(ops)
+
+            # empty leftovers
+            await self.premium.update_many(
+                {"plan.invoices": {"$exists": True}},
+                {"$unset": {"plan.invoices": ""}}
+            )
+            if moved:
+                print(f"[INFO] Moved {moved} invoices out of premium plans")
+        except Exception as e:
+            print(f"[WARN] Invoice migration failed: {e}")
+
+    async def _create_indexes(self):
+        try:
+            await self.users.create_index("id", unique=True)
+            await self.groups.create_index("id", unique=True)
+            await self.bans.create_index("id")
+            await self.warns.create_index([("user_id", 1), ("chat_id", 1)])
+            await self.premium.create_index("id", unique=True)
+            await self.premium.create_index(
+                "plan.expire",
+                partialFilterExpression={"plan.premium": True}
+            )
+            await self.reminders.create_index([("sent", 1), ("remind_at", 1)])
+            await self.invoices.create_index([("user_id", 1), ("created_at", -1)])
         except:
             pass
 
+    async def _ensure_ban_ttl(self):
+        """TTL index on bans.until (replaces the old plain until_1 index)"""
+        try:
+            await self.bans.update_many(
+                {"until": {"$type": "number"}},
+                [{"$set": {"until": {"$toDate": {"$multiply": ["$until", 1000]}}}}]
+            )
+            indexes = await self.bans.index_information()
+            if "until_1" in indexes and "expireAfterSeconds" not in indexes["until_1"]:
+                await self.bans.drop_index("until_1")
+            await self.bans.create_index("until", expireAfterSeconds=0)
+        except Exception as e:
+            print(f"[WARN] Ban TTL index setup failed: {e}")
+
+    def cache_stats(self) -> dict:
+        lookups = self.settings_hits + self.settings_misses
+        return {
+            "settings_cached": len(self.settings_cache),
+            "settings_hits": self.settings_hits,
+            "settings_misses": self.settings_misses,
+            "settings_hit_ratio": round(self.settings_hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def latency_stats(self) -> dict:
+        return {
+            name: {
+                "calls": stat["calls"],
+                "errors": stat["errors"],
+                "avg_ms": round(stat["total_ms"] / stat["calls"], 2) if stat["calls"] else 0.0,
+                "max_ms": round(stat["max_ms"], 2),
+            }
+            for name, stat in sorted(DB_LATENCY.items())
+        }
+
     # =========================
     # USERS
     # =========================
+    @timed
     async def is_user_exist(self, user_id: int):
-        return await asyncio.to_thread(
-            lambda: self.users.find_one({"id": user_id}) is not None
-        )
-
+        return await self.users.find_one({"id": user_id}, {"_id": 1}) is not None
+
+    def _new_user(self, user_id: int, name: str):
+        """(filter, update) that inserts the user once and never overwrites"""
+        return {"id": user_id}, {"$setOnInsert": {
+            "id": user_id,
+            "name": name,
+            "created_at": time.time(),
+            "verify": self.default_verify.copy()
+        }}
+
+    @timed
     async def add_user(self, user_id: int, name: str):
-        if await self.is_user_exist(user_id):
-            return False
-
-        await asyncio.to_thread(
-            self.users.insert_one,
-            {
-                "id": user_id,
-                "name": name,
-                "created_at": time.time(),
-                "verify": self.default_verify.copy()
-            }
+        """Single round trip; True only if the user was new"""
+        result = await self.users.update_one(*self._new_user(user_id, name), upsert=True)
+        return result.upserted_id is not None
+
+    @timed
+    async def add_users_bulk(self, users: dict):
+        """Upsert many {user_id: name} at once; returns how many were new"""
+        if not users:
+            return 0
+        result = await self.users.bulk_write(
+            [UpdateOne(*self._new_user(uid, name), upsert=True) for uid, name in users.items()],
+            ordered=False
         )
-        return True
-
+        return result.upserted_count
+
+    @staticmethod
+    async def _paged(collection, query: dict, projection: dict, batch_size: int):
+        """
+        Keyset pages over the unique `id` index (id > last id, sorted, limited).
+        Every page is its own short query, so a slow consumer (broadcast
+        FloodWaits, reminder sends) never holds a cursor past the idle timeout.
+        """
+        projection = {**projection, "id": 1}
+        last = None
+        while True:
+            page_query = dict(query)
+            if last is not None:
+                page_query["id"] = {"$gt": last}
+
+            page = await collection.find(page_query, projection) \
+                .sort("id", 1).limit(batch_size).to_list(batch_size)
+            for doc in page:
+                yield doc
+
+            last = page[-1].get("id") if page else None
+            if len(page) < batch_size or last is None:
+                return
+
+    async def iter_users(self, projection: dict = None, query: dict = None, batch_size: int = 1000):
+        """Stream user docs (only `projection` fields) one page at a time"""
+        async for doc in self._paged(
+            self.users, query or {}, projection or {"id": 1, "_id": 0}, batch_size
+        ):
+            yield doc
+
+    async def iter_user_ids(self, batch_size: int = 5000):
+        async for doc in self.iter_users(batch_size=batch_size):
+            if "id" in doc:
+                yield doc["id"]
+
+    @timed
+    async def delete_user(self, user_id: int):
+        await self.users.delete_one({"id": user_id})
+        for listener in self.delete_listeners:
+            listener(user_id)
+
+    @timed
     async def total_users_count(self):
-        return await asyncio.to_thread(self.users.count_documents, {})
-
-    async def get_all_users(self):
-        return await asyncio.to_thread(lambda: list(self.users.find({})))
+        return await self.users.count_documents({})
 
     # =========================
     # BANS
     # =========================
-    async def get_banned_users(self):
-        return await asyncio.to_thread(
-            lambda: list(self.bans.find({"until": {"$gt": time.time()}}))
-        )
-
-    async def ban_user(self, user_id: int, until: float, reason: str = ""):
-        await asyncio.to_thread(
-            self.bans.update_one,
+    # `until` is a Date under a TTL index: the server deletes expired bans.
+    async def iter_banned_users(self, batch_size: int = 1000):
+        cursor = self.bans.find(
+            {"until": {"$gt": datetime.utcnow()}},
+            {"_id": 0, "id": 1, "until": 1, "reason": 1}
+        ).batch_size(batch_size)
+        async for doc in cursor:
+            yield doc
+
+    @timed
+    async def ban_user(self, user_id: int, until, reason: str = ""):
+        """`until`: datetime (naive UTC) or unix timestamp"""
+        if isinstance(until, (int, float)):
+            until = datetime.utcfromtimestamp(until)
+
+        await self.bans.update_one(
             {"id": user_id},
             {"$set": {
                 "until": until,
@@ -152,21 +349,26 @@ class Database:
             }},
             upsert=True
         )
+        for listener in self.ban_listeners:
+            listener(user_id, until, reason)
         return True
 
+    @timed
     async def unban_user(self, user_id: int):
-        await asyncio.to_thread(self.bans.delete_one, {"id": user_id})
+        await self.bans.delete_one({"id": user_id})
+        for listener in self.ban_listeners:
+            listener(user_id, None, "")
         return True
 
+    @timed
     async def get_ban_status(self, user_id: int):
-        ban = await asyncio.to_thread(self.bans.find_one, {"id": user_id})
+        """DB view of one ban; hot paths use ban_registry instead"""
+        ban = await self.bans.find_one(
+            {"id": user_id, "until": {"$gt": datetime.utcnow()}}
+        )
         if not ban:
             return {"status": False}
 
-        if ban.get("until", 0) <= time.time():
-            await self.unban_user(user_id)
-            return {"status": False}
-
         return {
             "status": True,
             "reason": ban.get("reason", ""),
@@ -176,45 +378,162 @@ class Database:
     # =========================
     # GROUPS
     # =========================
+    @timed
     async def add_group(self, chat_id: int, title: str):
-        exists = await asyncio.to_thread(self.groups.find_one, {"id": chat_id})
+        exists = await self.groups.find_one({"id": chat_id}, {"_id": 1})
         if exists:
             return False
 
-        await asyncio.to_thread(
-            self.groups.insert_one,
-            {
-                "id": chat_id,
-                "title": title,
-                "settings": self.default_settings.copy(),
-                "joined_at": time.time()
-            }
-        )
+        await self.groups.insert_one({
+            "id": chat_id,
+            "title": title,
+            "settings": self.default_settings.copy(),
+            "joined_at": time.time()
+        })
         return True
 
+    async def iter_chats(self, projection: dict = None, batch_size: int = 1000):
+        async for doc in self._paged(
+            self.groups, {}, projection or {"id": 1, "_id": 0}, batch_size
+        ):
+            yield doc
+
+    @timed
+    async def delete_chat(self, chat_id: int):
+        await self.groups.delete_one({"id": chat_id})
+        self.invalidate_settings(chat_id)
+
+    @timed
+    async def total_chats_count(self):
+        return await self.groups.count_documents({})
+
+    def _cache_settings(self, chat_id: int, settings: dict):
+        self.settings_cache[chat_id] = (settings, time.time())
+        self.settings_cache.move_to_end(chat_id)
+        while len(self.settings_cache) > SETTINGS_CACHE_SIZE:
+            self.settings_cache.popitem(last=False)
+
+    def invalidate_settings(self, chat_id: int):
+        self.settings_cache.pop(chat_id, None)
+
+    @timed
     async def get_settings(self, chat_id: int):
-        group = await asyncio.to_thread(self.groups.find_one, {"id": chat_id})
+        cached = self.settings_cache.get(chat_id)
+        if cached and time.time() - cached[1] < SETTINGS_TTL:
+            self.settings_hits += 1
+            self.settings_cache.move_to_end(chat_id)
+            return copy.deepcopy(cached[0])
+
+        self.settings_misses += 1
+        group = await self.groups.find_one({"id": chat_id}, {"settings": 1})
         settings = self.default_settings.copy()
         if group and "settings" in group:
             settings.update(group["settings"])
-        return settings
 
+        self._cache_settings(chat_id, settings)
+        return copy.deepcopy(settings)
+
+    @timed
     async def update_settings(self, chat_id: int, settings: dict):
-        await asyncio.to_thread(
-            self.groups.update_one,
+        try:
+            await self.groups.update_one(
+                {"id": chat_id},
+                {"$set": {"settings": settings}},
+                upsert=True
+            )
+        except Exception:
+            self.invalidate_settings(chat_id)
+            raise
+
+        # write-through: the next read sees exactly what was stored
+        merged = self.default_settings.copy()
+        merged.update(copy.deepcopy(settings))
+        self._cache_settings(chat_id, merged)
+        return True
+
+    # -------------------------
+    # ⚛️ ATOMIC SETTING OPS (no read, no lost updates)
+    # -------------------------
+    def _patch_cached(self, chat_id: int, patch):
+        """Apply the same change to the cached copy (if any) as was sent to Mongo"""
+        cached = self.settings_cache.get(chat_id)
+        if cached:
+            patch(cached[0])
+
+    @timed
+    async def set_setting(self, chat_id: int, key: str, value):
+        await self.groups.update_one(
+            {"id": chat_id},
+            {"$set": {f"settings.{key}": value}},
+            upsert=True
+        )
+        self._patch_cached(chat_id, lambda s: s.__setitem__(key, value))
+        return True
+
+    @timed
+    async def add_blacklist_word(self, chat_id: int, word: str):
+        await self.groups.update_one(
             {"id": chat_id},
-            {"$set": {"settings": settings}},
+            {"$addToSet": {"settings.blacklist": word}},
             upsert=True
         )
+
+        def patch(s):
+            words = s.setdefault("blacklist", [])
+            if word not in words:
+                words.append(word)
+
+        self._patch_cached(chat_id, patch)
+        return True
+
+    @timed
+    async def remove_blacklist_word(self, chat_id: int, word: str):
+        await self.groups.update_one(
+            {"id": chat_id},
+            {"$pull": {"settings.blacklist": word}}
+        )
+        self._patch_cached(
+            chat_id,
+            lambda s: s.__setitem__("blacklist", [w for w in s.get("blacklist", []) if w != word])
+        )
+        return True
+
+    # dlink keys are user text (may contain "." or "$"), so they can't be
+    # used in a dotted path: set/unset them with a pipeline update instead.
+    @timed
+    async def set_dlink(self, chat_id: int, word: str, delay: int):
+        await self.groups.update_one(
+            {"id": chat_id},
+            [{"$set": {"settings.dlink": {"$setField": {
+                "field": {"$literal": word},
+                "input": {"$ifNull": ["$settings.dlink", {}]},
+                "value": delay
+            }}}}],
+            upsert=True
+        )
+        self._patch_cached(chat_id, lambda s: s.setdefault("dlink", {}).__setitem__(word, delay))
+        return True
+
+    @timed
+    async def unset_dlink(self, chat_id: int, word: str):
+        await self.groups.update_one(
+            {"id": chat_id},
+            [{"$set": {"settings.dlink": {"$unsetField": {
+                "field": {"$literal": word},
+                "input": {"$ifNull": ["$settings.dlink", {}]}
+            }}}}]
+        )
+        self._patch_cached(chat_id, lambda s: s.get("dlink", {}).pop(word, None))
         return True
 
     # =========================
     # 💎 PREMIUM (🔥 FIXED)
     # =========================
+    @timed
     async def get_plan(self, user_id: int):
-        data = await asyncio.to_thread(
-            self.premium.find_one,
-            {"id": user_id}
+        data = await self.premium.find_one(
+            {"id": user_id},
+            {"_id": 0, "plan": 1}
         )
 
         if not data:
@@ -222,20 +541,128 @@ class Database:
 
         return data.get("plan", self.default_plan.copy())
 
+    @timed
     async def update_plan(self, user_id: int, plan_data: dict):
-        await asyncio.to_thread(
-            self.premium.update_one,
+        await self.premium.update_one(
             {"id": user_id},
             {"$set": {"plan": plan_data}},
             upsert=True
         )
+        for listener in self.plan_listeners:
+            listener(user_id, plan_data)
         return True
 
-    async def get_premium_users(self):
-        return await asyncio.to_thread(
-            lambda: list(self.premium.find({"plan.premium": True}))
+    async def iter_premium_users(
+        self,
+        projection: dict = None,
+        after: datetime = None,
+        before: datetime = None,
+        limit: int = 0,
+        batch_size: int = 500
+    ):
+        """
+        Stream active premium docs; defaults to PLAN_SUMMARY (no invoices).
+        `after`/`before` bound plan.expire (after < expire <= before).
+        With `limit`, one cursor walks the plan.expire index soonest first;
+        otherwise docs come in keyset pages by id.
+        """
+        query = {"plan.premium": True}
+        window = {}
+        if after is not None:
+            window["$gt"] = after
+        if before is not None:
+            window["$lte"] = before
+        if window:
+            query["plan.expire"] = window
+
+        if limit:
+            cursor = self.premium.find(query, projection or PLAN_SUMMARY) \
+                .sort("plan.expire", 1).limit(limit)
+            async for doc in cursor:
+                yield doc
+            return
+
+        async for doc in self._paged(self.premium, query, projection or PLAN_SUMMARY, batch_size):
+            yield doc
+
+    @timed
+    async def premium_expiry_buckets(self, boundaries: list, exclude: list = None):
+        """
+        Count active plans per expiry window [boundaries[i], boundaries[i+1]).
+        Plans past the last boundary are counted under "later".
+        """
+        pipeline = [
+            {"$match": {
+                "plan.premium": True,
+                "plan.expire": {"$type": "date"},
+                "id": {"$nin": list(exclude or [])}
+            }},
+            {"$bucket": {
+                "groupBy": "$plan.expire",
+                "boundaries": boundaries,
+                "default": "later",
+                "output": {"count": {"$sum": 1}}
+            }}
+        ]
+        cursor = await self.premium.aggregate(pipeline)
+        return {doc["_id"]: doc["count"] async for doc in cursor}
+
+    @timed
+    async def set_last_reminder(self, user_id: int, tag: str):
+        await self.premium.update_one(
+            {"id": user_id},
+            {"$set": {"plan.last_reminder": tag}}
         )
 
+    @timed
+    async def total_premium_count(self):
+        return await self.premium.count_documents({"plan.premium": True})
+
+    # =========================
+    # 🧾 INVOICES
+    # =========================
+    @timed
+    async def add_invoice(self, user_id: int, invoice: dict):
+        await self.invoices.insert_one({**invoice, "user_id": user_id})
+
+    @timed
+    async def get_invoices(self, user_id: int, limit: int = 10, skip: int = 0):
+        """Newest first; only the requested page leaves the server"""
+        cursor = self.invoices.find(
+            {"user_id": user_id}, {"_id": 0, "user_id": 0}
+        ).sort("created_at", -1).skip(skip).limit(limit)
+        return await cursor.to_list(limit)
+
+
+
+    # =========================
+    # 🔗 STREAM LINKS (file _id -> BIN message)
+    # =========================
+    @timed
+    async def get_stream_link(self, file_id: str):
+        doc = await self.stream_links.find_one({"_id": file_id})
+        return doc["msg_id"] if doc else None
+
+    @timed
+    async def set_stream_link(self, file_id: str, msg_id: int):
+        await self.stream_links.update_one(
+            {"_id": file_id},
+            {"$set": {"msg_id": msg_id, "created_at": time.time()}},
+            upsert=True
+        )
+        return True
+
+    @timed
+    async def delete_stream_link(self, file_id: str):
+        await self.stream_links.delete_one({"_id": file_id})
+
+    # =========================
+    # 📊 SERVER STATS
+    # =========================
+    @timed
+    async def db_stats(self):
+        return await dbase.command("dbstats")
+
 
 # =========================
 # EXPORT
@@ -96,6 +96,8 @@ if not DATA_DATABASE_URL:
     exit()
 
 DATABASE_NAME = environ.get('DATABASE_NAME', "bot_db")
+DATABASE_POOL_SIZE = int(environ.get('DATABASE_POOL_SIZE', 100))  # async client, no thread cap
+DATABASE_MIN_POOL = int(environ.get('DATABASE_MIN_POOL', 5))
 
 # 🔥 MAIN COLLECTION (Backward Compatible)
 COLLECTION_NAME = environ.get('COLLECTION_NAME', 'files')
@@ -146,6 +148,7 @@ AUTO_DELETE = is_enabled('AUTO_DELETE', False)
 WELCOME = is_enabled('WELCOME', True)
 PROTECT_CONTENT = is_enabled('PROTECT_CONTENT', False)
 LINK_MODE = is_enabled("LINK_MODE", True)
+CONTEXT_DEBUG = is_enabled('CONTEXT_DEBUG', False)  # log DB/API round trips per update
 
 # ================= STREAM =================
 
@@ -171,6 +174,55 @@ else:
     logger.error('URL is invalid')
     exit()
 
+# 🔥 PROCESS LAYOUT
+# combined = bot + web streamer in one process (python bot.py)
+# bot      = bot only, streamer runs separately (python stream.py)
+WEB_MODE = environ.get('WEB_MODE', 'combined').lower()
+if WEB_MODE not in ('combined', 'bot'):
+    logger.error('WEB_MODE must be combined or bot')
+    exit()
+STREAM_INTERNAL_URL = environ.get('STREAM_INTERNAL_URL', f'http://127.0.0.1:{PORT}/')
+if not STREAM_INTERNAL_URL.endswith("/"):
+    STREAM_INTERNAL_URL += '/'
+STREAM_SECRET = environ.get('STREAM_SECRET', '')  # bot <-> streamer IPC; '' = internal routes off
+if WEB_MODE == 'bot' and not STREAM_SECRET:
+    logger.error('STREAM_SECRET is required when WEB_MODE=bot')
+    exit()
+
+# 🔥 MEDIA SESSION POOL
+STREAM_DC_CONCURRENCY = int(environ.get('STREAM_DC_CONCURRENCY', 8))
+STREAM_HEALTH_INTERVAL = int(environ.get('STREAM_HEALTH_INTERVAL', 60))
+STREAM_PREFETCH = int(environ.get('STREAM_PREFETCH', 2))
+STREAM_PREFETCH_MAX = int(environ.get('STREAM_PREFETCH_MAX', 4))  # long sequential reads
+STREAM_CACHE_SIZE = int(environ.get('STREAM_CACHE_SIZE', 32))  # MB of 1 MB blocks in RAM
+STREAM_DISK_CACHE_DIR = environ.get('STREAM_DISK_CACHE_DIR', '')  # shared by all workers, '' = off (1 worker)
+STREAM_DISK_CACHE_SIZE = int(environ.get('STREAM_DISK_CACHE_SIZE', 1024))  # MB
+
+# 🔥 STREAM WORKERS (python stream.py)
+STREAM_WORKERS = int(environ.get('STREAM_WORKERS', 1))  # >1 shares PORT via SO_REUSEPORT
+if STREAM_WORKERS > 1 and not STREAM_DISK_CACHE_DIR:
+    # Workers (and a prewarm landing on any one of them) share blocks on disk
+    STREAM_DISK_CACHE_DIR = os.path.join('/tmp', 'stream_block_cache')
+STREAM_KEEPALIVE = int(environ.get('STREAM_KEEPALIVE', 75))
+STREAM_ACCESS_LOG = is_enabled('STREAM_ACCESS_LOG', False)
+
+# 🔥 STREAM ADMISSION CONTROL
+# Behind Koyeb / Render / Heroku (or any reverse proxy) every peer address is
+# the proxy: set STREAM_TRUST_PROXY=true there, or per-IP limits see one client.
+STREAM_TRUST_PROXY = is_enabled('STREAM_TRUST_PROXY', False)
+STREAM_PROXY_HOPS = int(environ.get('STREAM_PROXY_HOPS', 1))  # proxies in front that append X-Forwarded-For
+STREAM_MAX_ACTIVE = int(environ.get('STREAM_MAX_ACTIVE', 64))
+# 0 = unlimited; defaults on only when real client IPs are known
+STREAM_MAX_PER_IP = int(environ.get('STREAM_MAX_PER_IP', 4 if STREAM_TRUST_PROXY else 0))
+if STREAM_MAX_PER_IP and not STREAM_TRUST_PROXY:
+    logger.warning(
+        'STREAM_MAX_PER_IP is set but STREAM_TRUST_PROXY is off: behind a platform '
+        'proxy every viewer shares one per-IP bucket. Set STREAM_TRUST_PROXY=true.'
+    )
+STREAM_QUEUE_SIZE = int(environ.get('STREAM_QUEUE_SIZE', 32))
+STREAM_QUEUE_TIMEOUT = int(environ.get('STREAM_QUEUE_TIMEOUT', 10))
+STREAM_BANDWIDTH = int(environ.get('STREAM_BANDWIDTH', 0))  # bytes/sec, 0 = unlimited
+
 # ================= PREMIUM =================
 
 IS_PREMIUM = is_enabled('IS_PREMIUM', True)
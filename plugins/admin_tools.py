@@ -12,7 +12,10 @@ from hydrogram.errors import MessageNotModified, MessageIdInvalid, BadRequest, L
 from info import ADMINS, LOG_CHANNEL
 from database.users_chats_db import db
 from database.ia_filterdb import db_count_documents, delete_files
-from utils import get_size, get_readable_time, temp
+from database.entitlements import entitlements
+from database.user_registry import user_registry
+from database.ban_registry import ban_registry
+from utils import get_size, get_readable_time, temp, CONTEXT_STATS
 
 
 # ======================================================
@@ -82,7 +85,7 @@ async def build_dashboard():
         pass
 
     try:
-        stats["chats"] = await asyncio.to_thread(db.groups.count_documents, {})
+        stats["chats"] = await db.total_chats_count()
     except:
         pass
 
@@ -92,14 +95,12 @@ async def build_dashboard():
         pass
 
     try:
-        stats["premium"] = await asyncio.to_thread(
-            db.premium.count_documents, {"plan.premium": True}
-        )
+        stats["premium"] = await db.total_premium_count()
     except:
         pass
 
     try:
-        info = await asyncio.to_thread(db.users.database.command, "dbstats")
+        info = await db.db_stats()
         stats["used_data"] = get_size(info.get("dataSize", 0))
     except:
         pass
@@ -132,6 +133,33 @@ async def build_dashboard():
     )
 
 
+def build_runtime():
+    """In-process counters (per-update context, caches, registries)"""
+    ctx = CONTEXT_STATS
+    cache = db.cache_stats()
+    prm = entitlements.stats()
+    reg = user_registry.stats()
+    bans = ban_registry.stats()
+    per_update = ctx["db_calls"] / ctx["updates"] if ctx["updates"] else 0
+    return (
+        "🧵 <b>RUNTIME STATS</b>\n\n"
+        f"📨 <b>Updates</b>          : <code>{ctx['updates']}</code>\n"
+        f"🔍 <b>Settings lookups</b> : <code>{ctx['lookups']}</code>\n"
+        f"🗄 <b>DB round trips</b>   : <code>{ctx['db_calls']}</code> "
+        f"(<code>{per_update:.2f}</code>/update)\n"
+        f"📡 <b>API calls</b>        : <code>{ctx['api_calls']}</code>\n"
+        f"🧠 <b>Live contexts</b>    : <code>{len(temp.CONTEXTS)}</code>\n\n"
+        f"⚙️ <b>Settings cache</b>   : <code>{cache['settings_cached']}</code> groups, "
+        f"<code>{cache['settings_hit_ratio']:.0%}</code> hits\n"
+        f"💎 <b>Entitlements</b>     : <code>{prm['premium_users']}</code> plans, "
+        f"<code>{prm['lookups']}</code> lookups\n"
+        f"👥 <b>User registry</b>    : <code>{reg['known']}</code> known, "
+        f"<code>{reg['pending']}</code> pending, <code>{reg['registered']}</code> new\n"
+        f"🚫 <b>Bans</b>             : <code>{bans['banned']}</code> active, "
+        f"<code>{bans['dropped']}</code> updates dropped"
+    )
+
+
 # ======================================================
 # 🎛 MAIN ADMIN PANEL BUTTONS
 # ======================================================
@@ -146,6 +174,9 @@ def admin_panel_buttons():
             InlineKeyboardButton("🔄 Refresh", callback_data="admin_refresh"),
             InlineKeyboardButton("🔄 Restart Bot", callback_data="admin_restart")
         ],
+        [
+            InlineKeyboardButton("🧵 Runtime", callback_data="admin_runtime")
+        ],
         [
             InlineKeyboardButton("❌ Close", callback_data="close_data")
         ]
@@ -207,7 +238,7 @@ async def admin_callbacks(bot, query: CallbackQuery):
 
     # Premium panel
     elif action == "admin_premium":
-        total = db.premium.count_documents({"plan.premium": True})
+        total = await db.total_premium_count()
         await safe_edit(
             query.message,
             (
@@ -241,6 +272,18 @@ async def admin_callbacks(bot, query: CallbackQuery):
         except Exception as e:
             await safe_edit(query.message, f"❌ Restart failed: {e}")
 
+    # Runtime counters
+    elif action == "admin_runtime":
+        await safe_edit(
+            query.message,
+            build_runtime(),
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔄 Refresh", callback_data="admin_runtime"),
+                InlineKeyboardButton("🔙 Back", callback_data="admin_back")
+            ]])
+        )
+        await safe_answer(query)
+
     # Back to main panel
     elif action == "admin_back":
         text = await build_dashboard()
@@ -267,26 +310,19 @@ async def premium_callbacks(bot, query: CallbackQuery):
         days = int(action.split("_")[-1])
         limit = now + timedelta(days=days)
 
-        # FIX 1: await the coroutine
-        users = await db.get_premium_users()
         result = []
 
-        for u in users:
+        # Soonest first, straight off the plan.expire index
+        async for u in db.iter_premium_users(
+            after=now, before=limit, limit=20 + len(ADMINS)
+        ):
             uid = u.get("id")
             if uid in ADMINS:
                 continue
 
-            plan = u.get("plan", {})
-            expire = plan.get("expire")
-            if not expire:
-                continue
-
-            if isinstance(expire, (int, float)):
-                expire = datetime.utcfromtimestamp(expire)
-
-            if now <= expire <= limit:
-                left = int((expire - now).total_seconds())
-                result.append(f"👤 <code>{uid}</code> → ⏳ {get_readable_time(left)}")
+            expire = u["plan"]["expire"]
+            left = int((expire - now).total_seconds())
+            result.append(f"👤 <code>{uid}</code> → ⏳ {get_readable_time(left)}")
 
             if len(result) >= 20:
                 break
@@ -311,33 +347,18 @@ async def premium_callbacks(bot, query: CallbackQuery):
 
     # Expiry chart
     elif action == "prm_chart":
-        # FIX 2: await the coroutine
-        users = await db.get_premium_users()
-        c_3 = c_7 = c_30 = c_30p = 0
-
-        for u in users:
-            uid = u.get("id")
-            if uid in ADMINS:
-                continue
-
-            plan = u.get("plan", {})
-            expire = plan.get("expire")
-            if not expire:
-                continue
-
-            if isinstance(expire, (int, float)):
-                expire = datetime.utcfromtimestamp(expire)
-
-            days_left = (expire - now).days
-
-            if days_left <= 3:
-                c_3 += 1
-            elif days_left <= 7:
-                c_7 += 1
-            elif days_left <= 30:
-                c_30 += 1
-            else:
-                c_30p += 1
+        # Whole days left: 0–3 means expiring before now + 4 days, etc.
+        # Second precision so the returned bucket keys (ms dates) match.
+        start = now.replace(microsecond=0)
+        floor = datetime(1970, 1, 1)
+        b_3, b_7, b_30 = (start + timedelta(days=d) for d in (4, 8, 31))
+        buckets = await db.premium_expiry_buckets(
+            [floor, b_3, b_7, b_30], exclude=ADMINS
+        )
+        c_3 = buckets.get(floor, 0)
+        c_7 = buckets.get(b_3, 0)
+        c_30 = buckets.get(b_7, 0)
+        c_30p = buckets.get("later", 0)
 
         await safe_edit(
             query.message,
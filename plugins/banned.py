@@ -0,0 +1,40 @@
+from hydrogram import Client, filters
+
+from info import ADMINS
+from database.ban_registry import ban_registry
+
+
+# ======================================================
+# 🚫 BANNED USER GATE (RUNS BEFORE EVERYTHING ELSE)
+# ======================================================
+# group=-2: ahead of the user registry (-1) and every plugin.
+# One set lookup per update; banned users stop here.
+
+async def _is_banned(_, __, update):
+    user = update.from_user
+    return bool(user) and user.id not in ADMINS and ban_registry.is_banned(user.id)
+
+banned_user = filters.create(_is_banned)
+
+
+@Client.on_message(banned_user, group=-2)
+async def drop_banned_message(client, message):
+    ban_registry.dropped += 1
+    message.stop_propagation()
+
+
+@Client.on_callback_query(banned_user, group=-2)
+async def drop_banned_query(client, query):
+    ban_registry.dropped += 1
+    try:
+        await query.answer("🚫 You are banned from using this bot", show_alert=True)
+    except Exception:
+        pass
+    query.stop_propagation()
+
+
+@Client.on_inline_query(banned_user, group=-2)
+async def drop_banned_inline(client, query):
+    ban_registry.dropped += 1
+    query.stop_propagation()
+
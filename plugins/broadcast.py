@@ -4,6 +4,7 @@ from hydrogram import Client, filters
 from hydrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from database.users_chats_db import db
+from database.entitlements import entitlements
 from utils import (
     broadcast_messages,
     groups_broadcast_messages,
@@ -14,6 +15,30 @@ from info import ADMINS
 
 lock = asyncio.Lock()
 
+
+async def batched(docs, size: int):
+    """Group an async stream of docs into lists of `size`"""
+    batch = []
+    async for doc in docs:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def premium_targets():
+    for uid in list(entitlements.plans):
+        if entitlements.is_active(uid, grace=False):
+            yield {"id": uid}
+
+
+async def free_targets():
+    async for u in db.iter_users():
+        if not entitlements.is_active(u.get("id"), grace=False):
+            yield u
+
 # ======================================================
 # 🛑 CANCEL CALLBACK
 # ======================================================
@@ -47,18 +72,16 @@ async def user_broadcast(bot, message):
     pin = message.command[0] == "pin_broadcast"
     mode = message.command[0]
 
-    all_users = await db.get_all_users()
-
-    # --- segmentation ---
+    # --- segmentation (premium comes from the in-memory entitlements) ---
+    premium = sum(1 for uid in entitlements.plans if entitlements.is_active(uid, grace=False))
     if mode == "broadcast_premium":
-        users = [u for u in all_users if u.get("status", {}).get("premium")]
+        users, total = premium_targets(), premium
     elif mode == "broadcast_free":
-        users = [u for u in all_users if not u.get("status", {}).get("premium")]
+        users, total = free_targets(), max(0, await db.total_users_count() - premium)
     else:
-        users = all_users
+        users, total = db.iter_users(), await db.total_users_count()
 
-    total = len(users)
-    if not users:
+    if not total:
         return await message.reply("❌ No users found for this broadcast.")
 
     status = await message.reply_text("🚀 Broadcasting started…")
@@ -68,7 +91,7 @@ async def user_broadcast(bot, message):
     done = success = failed = removed = 0
 
     async with lock:
-        for batch in [users[i:i + 25] for i in range(0, total, 25)]:
+        async for batch in batched(users, 25):
             if temp.USERS_CANCEL:
                 temp.USERS_CANCEL = False
                 break
@@ -129,10 +152,9 @@ async def group_broadcast(bot, message):
         return await message.reply("⚠️ Another broadcast is running.")
 
     pin = message.command[0] == "pin_grp_broadcast"
-    groups = await db.get_all_chats()
-    total = len(groups)
+    total = await db.total_chats_count()
 
-    if not groups:
+    if not total:
         return await message.reply("❌ No groups found.")
 
     status = await message.reply_text("🚀 Group broadcast started…")
@@ -142,7 +164,7 @@ async def group_broadcast(bot, message):
     done = success = failed = 0
 
     async with lock:
-        for batch in [groups[i:i + 15] for i in range(0, total, 15)]:
+        async for batch in batched(db.iter_chats(), 15):
             if temp.GROUPS_CANCEL:
                 temp.GROUPS_CANCEL = False
                 break
@@ -30,6 +30,8 @@ from info import (
 from utils import is_premium, temp  # ✅ REMOVED: get_wish
 from database.users_chats_db import db
 from database.ia_filterdb import db_count_documents
+from web.utils.ipc import request_prewarm
+from web.utils.media_meta import get_media_meta
 
 
 # ======================================================
@@ -129,6 +131,49 @@ async def safe_answer_query(query, text="", show_alert=False, max_retries=2):
     return False
 
 
+# ======================================================
+# 🔗 STREAM LINK LOOKUP (RAM -> DB -> BIN UPLOAD)
+# ======================================================
+
+MAX_STREAM_LINKS = 10000
+STREAM_LINK_TASKS = {}  # file_id -> in-flight resolve, shared by concurrent taps
+
+
+async def _resolve_stream_msg_id(client, file_id):
+    msg_id = temp.STREAM_LINKS.get(file_id) or await db.get_stream_link(file_id)
+
+    # A saved BIN message can be deleted: check it (meta is cached for an hour)
+    if msg_id and not await get_media_meta(msg_id):
+        temp.STREAM_LINKS.pop(file_id, None)
+        await db.delete_stream_link(file_id)
+        msg_id = None
+
+    if not msg_id:
+        msg = await client.send_cached_media(
+            chat_id=BIN_CHANNEL,
+            file_id=file_id
+        )
+        msg_id = msg.id
+        await db.set_stream_link(file_id, msg_id)
+
+    if file_id not in temp.STREAM_LINKS and len(temp.STREAM_LINKS) >= MAX_STREAM_LINKS:
+        temp.STREAM_LINKS.pop(next(iter(temp.STREAM_LINKS)), None)
+    temp.STREAM_LINKS[file_id] = msg_id
+
+    return msg_id
+
+
+async def get_stream_msg_id(client, file_id):
+    """Return the BIN_CHANNEL message for a file, copying it only when missing"""
+    task = STREAM_LINK_TASKS.get(file_id)
+    if task is None:
+        task = STREAM_LINK_TASKS[file_id] = asyncio.ensure_future(
+            _resolve_stream_msg_id(client, file_id)
+        )
+        task.add_done_callback(lambda _: STREAM_LINK_TASKS.pop(file_id, None))
+    return await asyncio.shield(task)
+
+
 # ======================================================
 # 🔁 CALLBACK HANDLER (OPTIMIZED)
 # ======================================================
@@ -231,13 +276,10 @@ async def cb_handler(client: Client, query: CallbackQuery):
 
             # Generate stream links
             try:
-                msg = await client.send_cached_media(
-                    chat_id=BIN_CHANNEL,
-                    file_id=file_id
-                )
+                msg_id = await get_stream_msg_id(client, file_id)
 
-                watch = f"{URL}watch/{msg.id}"
-                download = f"{URL}download/{msg.id}"
+                watch = f"{URL}watch/{msg_id}"
+                download = f"{URL}download/{msg_id}"
 
                 success = await safe_edit_markup(
                     query.message,
@@ -252,6 +294,9 @@ async def cb_handler(client: Client, query: CallbackQuery):
                     )
                 )
                 
+                # Warm head/tail blocks before the browser asks for them
+                asyncio.create_task(request_prewarm(msg_id))
+
                 if success:
                     await safe_answer_query(query, "✅ Links ready")
                 else:
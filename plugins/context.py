@@ -0,0 +1,16 @@
+from hydrogram import Client, filters
+
+from utils import finish_context
+
+
+# ======================================================
+# 🧵 UPDATE CONTEXT CLEANUP (RUNS AFTER EVERY OTHER HANDLER)
+# ======================================================
+# group=100: the dispatcher reaches it only after all earlier groups have
+# finished, so the per-update summary is logged as soon as the update is done.
+# Updates that stop propagation earlier are evicted by TTL instead.
+
+@Client.on_message(filters.incoming, group=100)
+async def finish_update_context(client, message):
+    if message.chat:
+        finish_context(message)
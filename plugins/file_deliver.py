@@ -1,21 +1,19 @@
 import asyncio
 import time
 import logging
-from datetime import datetime, timedelta
 
 from hydrogram import Client, filters
 from hydrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 
-from info import IS_STREAM, PM_FILE_DELETE_TIME, PROTECT_CONTENT, ADMINS
+from info import IS_STREAM, PM_FILE_DELETE_TIME, PROTECT_CONTENT
 from database.ia_filterdb import get_file_details
-from database.users_chats_db import db
+from database.entitlements import entitlements
 from utils import get_settings, get_size, temp, is_premium
 
 
 # ======================================================
 # CONFIG
 # ======================================================
-GRACE_PERIOD = timedelta(minutes=30)
 RESEND_EXPIRE_TIME = 60  # seconds
 
 # Track active deletion tasks
@@ -26,19 +24,8 @@ active_tasks = {}
 # PREMIUM CHECK WITH GRACE PERIOD
 # ======================================================
 async def has_premium_or_grace(user_id: int) -> bool:
-    """Check if user is admin or has premium with grace period"""
-    if user_id in ADMINS:
-        return True
-
-    plan = await db.get_plan(user_id)
-    if not plan or not plan.get("premium"):
-        return False
-
-    expire = plan.get("expire")
-    if isinstance(expire, (int, float)):
-        expire = datetime.utcfromtimestamp(expire)
-
-    return bool(expire and datetime.utcnow() <= expire + GRACE_PERIOD)
+    """Check if user is admin or has premium with grace period (no DB call)"""
+    return entitlements.has_access(user_id)
 
 
 # ======================================================
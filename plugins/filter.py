@@ -15,7 +15,8 @@ from utils import (
     is_premium,
     temp,
     learn_keywords,
-    suggest_query
+    suggest_query,
+    get_context
 )
 
 # Configuration
@@ -67,14 +68,12 @@ async def search_toggle(client, message):
                 quote=True
             )
         
-        # Get current settings
-        settings = await db.get_settings(message.chat.id) or {}
-        
         # Check for on/off parameter
         args = message.text.split()
         
         if len(args) < 2:
-            # Show current status
+            # Show current status (the only path that reads settings)
+            settings = await db.get_settings(message.chat.id) or {}
             current = settings.get("search", True)
             status = "✅ Enabled" if current else "❌ Disabled"
             
@@ -89,8 +88,7 @@ async def search_toggle(client, message):
         action = args[1].lower()
         
         if action == "on":
-            settings["search"] = True
-            await db.update_settings(message.chat.id, settings)
+            await db.set_setting(message.chat.id, "search", True)
             
             return await message.reply_text(
                 "✅ <b>Search Enabled!</b>\n\n"
@@ -99,8 +97,7 @@ async def search_toggle(client, message):
             )
         
         elif action == "off":
-            settings["search"] = False
-            await db.update_settings(message.chat.id, settings)
+            await db.set_setting(message.chat.id, "search", False)
             
             return await message.reply_text(
                 "❌ <b>Search Disabled!</b>\n\n"
@@ -217,6 +214,7 @@ async def filter_handler(client, message):
 
         user_id = message.from_user.id
         raw_search = message.text.strip().lower()
+        ctx = get_context(message)
 
         # Minimum length check
         if len(raw_search) < 2:
@@ -235,7 +233,7 @@ async def filter_handler(client, message):
             if user_id not in ADMINS:
                 # Check premium status
                 try:
-                    user_is_premium = await is_premium(user_id, client)
+                    user_is_premium = await ctx.premium()
                 except Exception as e:
                     print(f"Premium check error for {user_id}: {e}")
                     user_is_premium = False
@@ -280,7 +278,7 @@ async def filter_handler(client, message):
         # 🚫 GROUP SEARCH - CHECK IF ENABLED
         # ==============================
         else:
-            stg = await db.get_settings(message.chat.id) or {}
+            stg = await ctx.settings()
             
             # ✅ NEW: Check if search is disabled
             if stg.get("search") is False:
@@ -293,7 +291,7 @@ async def filter_handler(client, message):
             # Rate limit check for groups (non-premium users only)
             if user_id not in ADMINS:
                 try:
-                    user_is_premium = await is_premium(user_id, client)
+                    user_is_premium = await ctx.premium()
                 except:
                     user_is_premium = False
                 
@@ -325,7 +323,8 @@ async def filter_handler(client, message):
             search=search,
             offset=0,
             source_chat_id=source_chat_id,
-            is_pm=is_pm
+            is_pm=is_pm,
+            ctx=ctx
         )
     
     except Exception as e:
@@ -353,7 +352,8 @@ async def send_results(
     source_chat_id,
     is_pm,
     message=None,
-    tried_fallback=False
+    tried_fallback=False,
+    ctx=None
 ):
     try:
         # Determine results per page based on PM or Group
@@ -381,7 +381,8 @@ async def send_results(
                         source_chat_id,
                         is_pm,
                         message,
-                        True
+                        True,
+                        ctx
                     )
             except Exception as e:
                 print(f"Fallback suggestion error: {e}")
@@ -399,7 +400,7 @@ async def send_results(
         total_pages = ceil(total / results_per_page)
 
         try:
-            is_premium_user = await is_premium(owner, client)
+            is_premium_user = await (ctx.premium() if ctx else is_premium(owner, client))
             crown = "👑 " if is_premium_user else ""
         except:
             crown = ""
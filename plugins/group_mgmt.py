@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from hydrogram import Client, filters, enums
 from hydrogram.types import ChatPermissions
 from database.users_chats_db import db
+from utils import get_context
 
 # =========================
 # CONFIG
@@ -99,14 +100,7 @@ async def add_blacklist(client, message):
         return
 
     word = message.text.split(None, 1)[1].lower()
-    data = await db.get_settings(message.chat.id) or {}
-
-    blacklist = data.get("blacklist", [])
-    blacklist.append(word)
-
-    data["blacklist"] = list(set(blacklist))
-    data.setdefault("blacklist_warn", True)
-    await db.update_settings(message.chat.id, data)
+    await db.add_blacklist_word(message.chat.id, word)
 
 @Client.on_message(filters.group & filters.command("removeblacklist"))
 async def remove_blacklist(client, message):
@@ -116,13 +110,7 @@ async def remove_blacklist(client, message):
         return
 
     word = message.text.split(None, 1)[1].lower()
-    data = await db.get_settings(message.chat.id) or {}
-    blacklist = data.get("blacklist", [])
-
-    if word in blacklist:
-        blacklist.remove(word)
-        data["blacklist"] = blacklist
-        await db.update_settings(message.chat.id, data)
+    await db.remove_blacklist_word(message.chat.id, word)
 
 @Client.on_message(filters.group & filters.command("blacklist"))
 async def view_blacklist(client, message):
@@ -144,19 +132,22 @@ async def blacklistwarn(client, message):
     if len(message.command) < 2:
         return
 
-    data = await db.get_settings(message.chat.id) or {}
-    data["blacklist_warn"] = message.command[1] == "on"
-    await db.update_settings(message.chat.id, data)
+    await db.set_setting(message.chat.id, "blacklist_warn", message.command[1] == "on")
 
 @Client.on_message(filters.group & filters.text)
 async def blacklist_filter(client, message):
     if not message.from_user:
         return
-    if await is_admin(client, message.chat.id, message.from_user.id):
-        return
 
-    data = await db.get_settings(message.chat.id) or {}
+    ctx = get_context(message)
+    data = await ctx.settings()
     blacklist = data.get("blacklist", [])
+    if not blacklist:
+        return
+
+    if await ctx.is_admin(client):
+        return
+
     warn_on = data.get("blacklist_warn", True)
     text = message.text.lower()
 
@@ -185,12 +176,7 @@ async def add_dlink(client, message):
         index = 2
 
     word = " ".join(args[index:]).lower()
-    data = await db.get_settings(message.chat.id) or {}
-    dlink = data.get("dlink", {})
-
-    dlink[word] = delay
-    data["dlink"] = dlink
-    await db.update_settings(message.chat.id, data)
+    await db.set_dlink(message.chat.id, word, delay)
 
 @Client.on_message(filters.group & filters.command("removedlink"))
 async def remove_dlink(client, message):
@@ -198,12 +184,7 @@ async def remove_dlink(client, message):
         return
 
     word = message.text.split(None, 1)[1].lower()
-    data = await db.get_settings(message.chat.id) or {}
-    dlink = data.get("dlink", {})
-
-    dlink.pop(word, None)
-    data["dlink"] = dlink
-    await db.update_settings(message.chat.id, data)
+    await db.unset_dlink(message.chat.id, word)
 
 @Client.on_message(filters.group & filters.command("dlinklist"))
 async def dlink_list(client, message):
@@ -222,7 +203,7 @@ async def dlink_list(client, message):
 
 @Client.on_message(filters.group & filters.text)
 async def silent_dlink_handler(client, message):
-    data = await db.get_settings(message.chat.id) or {}
+    data = await get_context(message).settings()
     dlink = data.get("dlink", {})
     text = message.text.lower()
 
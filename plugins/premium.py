@@ -9,6 +9,7 @@ from hydrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Callback
 
 from info import ADMINS, IS_PREMIUM, PRE_DAY_AMOUNT, UPI_ID, UPI_NAME, RECEIPT_SEND_USERNAME
 from database.users_chats_db import db
+from database.entitlements import entitlements
 from utils import is_premium
 
 
@@ -18,6 +19,7 @@ from utils import is_premium
 
 LISTEN_SHORT = 180
 LISTEN_LONG = 300
+INVOICE_PAGE = 10
 active_sessions = {}  
 
 
@@ -77,12 +79,12 @@ async def get_plan_data(uid):
     if uid in ADMINS:
         return None, "admin"
     
-    plan = await db.get_plan(uid)
-    if not plan or not plan.get("premium"):
+    entry = entitlements.get(uid)
+    if not entry:
         return None, "none"
     
-    expire = plan.get("expire")
-    exp_dt = get_expiry_datetime(expire)
+    exp_dt, plan_name = entry
+    plan = {"premium": True, "plan": plan_name, "expire": exp_dt}
     now = datetime.utcnow()
     remaining = exp_dt - now
     
@@ -207,12 +209,11 @@ async def myplan_cmd(client, message):
 
 @Client.on_message(filters.command("invoice") & filters.private)
 async def invoice_cmd(client, message):
-    plan = await db.get_plan(message.from_user.id)
-    invoices = plan.get("invoices", []) if plan else []
+    invoices = await db.get_invoices(message.from_user.id, limit=1)
     if not invoices:
         return await message.reply("❌ No invoices found")
     
-    inv = invoices[-1]
+    inv = invoices[0]
     await message.reply(
         f"""
 🧾 **Latest Invoice**
@@ -229,19 +230,30 @@ async def invoice_cmd(client, message):
     )
 
 
-@Client.on_callback_query(filters.regex("^show_invoices$"))
+@Client.on_callback_query(filters.regex(r"^show_invoices(#\d+)?$"))
 async def show_invoice_cb(client, query: CallbackQuery):
-    plan = await db.get_plan(query.from_user.id)
-    invoices = plan.get("invoices", []) if plan else []
+    page = int(query.data.split("#")[1]) if "#" in query.data else 0
+    
+    # one extra row tells us whether a next page exists
+    invoices = await db.get_invoices(
+        query.from_user.id, limit=INVOICE_PAGE + 1, skip=page * INVOICE_PAGE
+    )
     if not invoices:
         return await query.answer("❌ No invoices found", show_alert=True)
     
     text = "🧾 **Invoice History**\n\n"
-    for inv in invoices[-10:][::-1]:
+    for inv in invoices[:INVOICE_PAGE]:
         text += f"• `{inv.get('id')}` | ₹{inv.get('amount')} | {inv.get('plan')}\n"
         text += f"  📅 {inv.get('activated')} → {inv.get('expire')}\n\n"
     
-    await query.message.edit(text, reply_markup=back_btn())
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("⬅️ Newer", callback_data=f"show_invoices#{page - 1}"))
+    if len(invoices) > INVOICE_PAGE:
+        nav.append(InlineKeyboardButton("Older ➡️", callback_data=f"show_invoices#{page + 1}"))
+    
+    buttons = ([nav] if nav else []) + back_btn().inline_keyboard
+    await query.message.edit(text, reply_markup=InlineKeyboardMarkup(buttons))
 
 
 @Client.on_callback_query(filters.regex("^back_to_myplan$"))
@@ -541,16 +553,13 @@ async def update_user_premium(uid, plan_txt, amount):
         "created_at": now.timestamp()
     }
     
-    invoices = old.get("invoices", [])
-    invoices.append(invoice)
-    
     await db.update_plan(uid, {
         "premium": True,
         "plan": plan_txt,
-        "expire": expire_dt.timestamp(),
-        "activated_at": now.timestamp(),
-        "invoices": invoices
+        "expire": expire_dt,
+        "activated_at": now.timestamp()
     })
+    await db.add_invoice(uid, invoice)
     
     return expire_dt, invoice
 
@@ -0,0 +1,27 @@
+from hydrogram import Client, filters, enums
+
+from database.user_registry import user_registry
+
+
+# ======================================================
+# 👥 USER REGISTRY (RUNS BEFORE EVERY OTHER HANDLER)
+# ======================================================
+# group=-1: sees every update first and never stops propagation.
+# Known users cost one set lookup; new ones are flushed in batches.
+# Only private chats count: broadcasts can't reach users who never
+# started the bot.
+
+@Client.on_message(filters.private & filters.incoming, group=-1)
+async def register_message_user(client, message):
+    user = message.from_user
+    if user and not user.is_bot:
+        user_registry.seen(user.id, user.first_name)
+
+
+@Client.on_callback_query(group=-1)
+async def register_query_user(client, query):
+    user = query.from_user
+    if not user or user.is_bot:
+        return
+    if query.message and query.message.chat.type == enums.ChatType.PRIVATE:
+        user_registry.seen(user.id, user.first_name)
@@ -1,11 +1,13 @@
-import os
 import aiohttp
 import asyncio
+import mimetypes
 import time
+from aiohttp.payload import AsyncIterablePayload
 from hydrogram import Client, filters
 from hydrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
 from info import ADMINS
 from utils import is_premium
+from web.utils.custom_dl import TGCustomYield
 
 # Config
 MAX_FILE_SIZE = 100 * 1024 * 1024
@@ -71,75 +73,129 @@ class Progress:
         except:
             pass
 
+# Shared HTTP pool for all upload hosts
+UPLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=300)
+_upload_session = None
+
+def get_upload_session():
+    global _upload_session
+    if _upload_session is None or _upload_session.closed:
+        _upload_session = aiohttp.ClientSession(
+            timeout=UPLOAD_TIMEOUT,
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300)
+        )
+    return _upload_session
+
+async def close_upload_session():
+    global _upload_session
+    if _upload_session and not _upload_session.closed:
+        await _upload_session.close()
+    _upload_session = None
+
+def upload_name(media, file) -> str:
+    """File name, or unique id + extension for photos / voice / video notes"""
+    name = getattr(file, "file_name", None)
+    if name:
+        return name
+    ext = ".jpg" if media.media.value == "photo" else \
+        mimetypes.guess_extension(getattr(file, "mime_type", None) or "") or ".bin"
+    return f"{file.file_unique_id}{ext}"
+
+# Upload Hosts (plain URLs so local stub servers can stand in)
+UPLOAD_URLS = {
+    "gofile_servers": "https://api.gofile.io/servers",
+    "gofile": "https://{server}.gofile.io/uploadFile",
+    "catbox": "https://catbox.moe/user/api.php",
+    "tmpfiles": "https://tmpfiles.org/api/v1/upload",
+    "fileio": "https://file.io",
+}
+
+# Telegram -> Host Stream (no temp file)
+class TelegramFilePayload(AsyncIterablePayload):
+    """
+    Multipart file part fed straight from Telegram media sessions.
+    Size is known up front, so the request gets a Content-Length
+    instead of chunked encoding. Memory stays at the prefetch window.
+    """
+
+    def __init__(self, media_msg, size, progress=None, **kwargs):
+        super().__init__(self._chunks(media_msg, progress), **kwargs)
+        self._size = size
+
+    @staticmethod
+    async def _chunks(media_msg, progress):
+        chunks = TGCustomYield().iter_file(media_msg, cache=False)
+        try:
+            async for chunk in chunks:
+                if progress:
+                    await progress.update(len(chunk))
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+def file_form(field, upload, **fields):
+    data = aiohttp.FormData()
+    for key, value in fields.items():
+        data.add_field(key, value)
+    data.add_field(
+        field,
+        TelegramFilePayload(upload["media"], upload["size"], upload["progress"]),
+        filename=upload["name"],
+        content_type="application/octet-stream"
+    )
+    return data
+
 # Upload to GoFile
-async def upload_gofile(file_path):
-    async with aiohttp.ClientSession() as session:
-        # Get server
-        async with session.get("https://api.gofile.io/servers") as r:
-            if r.status != 200:
-                return None
-            data = await r.json()
-            server = data["data"]["servers"][0]["name"]
-        
-        # Upload
-        url = f"https://{server}.gofile.io/uploadFile"
-        with open(file_path, "rb") as f:
-            data = aiohttp.FormData()
-            data.add_field("file", f, filename=os.path.basename(file_path))
-            
-            async with session.post(url, data=data) as r:
-                if r.status != 200:
-                    return None
-                result = await r.json()
-                if result.get("status") == "ok":
-                    return result["data"]["downloadPage"]
+async def upload_gofile(upload):
+    session = get_upload_session()
+
+    # Get server
+    async with session.get(UPLOAD_URLS["gofile_servers"]) as r:
+        if r.status != 200:
+            return None
+        data = await r.json()
+        server = data["data"]["servers"][0]["name"]
+
+    # Upload
+    url = UPLOAD_URLS["gofile"].format(server=server)
+    async with session.post(url, data=file_form("file", upload)) as r:
+        if r.status != 200:
+            return None
+        result = await r.json()
+        if result.get("status") == "ok":
+            return result["data"]["downloadPage"]
     return None
 
 # Upload to Catbox
-async def upload_catbox(file_path):
-    async with aiohttp.ClientSession() as session:
-        with open(file_path, "rb") as f:
-            data = aiohttp.FormData()
-            data.add_field("reqtype", "fileupload")
-            data.add_field("fileToUpload", f, filename=os.path.basename(file_path))
-            
-            async with session.post("https://catbox.moe/user/api.php", data=data) as r:
-                if r.status == 200:
-                    link = await r.text()
-                    return link.strip() if link else None
+async def upload_catbox(upload):
+    data = file_form("fileToUpload", upload, reqtype="fileupload")
+    async with get_upload_session().post(UPLOAD_URLS["catbox"], data=data) as r:
+        if r.status == 200:
+            link = await r.text()
+            return link.strip() if link else None
     return None
 
 # Upload to TmpFiles
-async def upload_tmpfiles(file_path):
-    async with aiohttp.ClientSession() as session:
-        with open(file_path, "rb") as f:
-            data = aiohttp.FormData()
-            data.add_field("file", f, filename=os.path.basename(file_path))
-            
-            async with session.post("https://tmpfiles.org/api/v1/upload", data=data) as r:
-                if r.status == 200:
-                    result = await r.json()
-                    if result.get("status") == "success":
-                        url = result["data"]["url"]
-                        return url.replace("tmpfiles.org/", "tmpfiles.org/dl/")
+async def upload_tmpfiles(upload):
+    async with get_upload_session().post(UPLOAD_URLS["tmpfiles"], data=file_form("file", upload)) as r:
+        if r.status == 200:
+            result = await r.json()
+            if result.get("status") == "success":
+                url = result["data"]["url"]
+                return url.replace("tmpfiles.org/", "tmpfiles.org/dl/")
     return None
 
 # Upload to File.io
-async def upload_fileio(file_path):
-    async with aiohttp.ClientSession() as session:
-        with open(file_path, "rb") as f:
-            data = aiohttp.FormData()
-            data.add_field("file", f, filename=os.path.basename(file_path))
-            
-            async with session.post("https://file.io", data=data) as r:
-                if r.status == 200:
-                    result = await r.json()
-                    if result.get("success"):
-                        return result["link"]
+async def upload_fileio(upload):
+    async with get_upload_session().post(UPLOAD_URLS["fileio"], data=file_form("file", upload)) as r:
+        if r.status == 200:
+            result = await r.json()
+            if result.get("success"):
+                return result["link"]
     return None
 
 # Upload Handler
-async def do_upload(file_path, site, msg):
+async def do_upload(upload, site):
     uploaders = {
         "gofile": upload_gofile,
         "catbox": upload_catbox,
@@ -152,9 +208,10 @@ async def do_upload(file_path, site, msg):
         return None
     
     try:
-        link = await uploader(file_path)
+        link = await uploader(upload)
         return link
     except Exception as e:
+        print(f"[ERROR] Upload to {site} failed: {e}")
         return None
 
 # /upload Command
@@ -169,8 +226,8 @@ async def upload_cmd(bot, message):
         return await message.reply("❗ Reply to a file with /upload")
     
     media = message.reply_to_message
-    file = media.document or media.video or media.audio
-    size = getattr(file, "file_size", 0)
+    file = getattr(media, media.media.value, None)
+    size = getattr(file, "file_size", 0) or 0
     
     if size > MAX_FILE_SIZE:
         return await message.reply(f"❌ File too large (Max: {MAX_FILE_SIZE/1024/1024:.0f}MB)")
@@ -187,7 +244,7 @@ async def upload_cmd(bot, message):
     await message.reply(
         f"📤 **Select Upload Site**\n\n"
         f"📁 Size: {size/1024/1024:.1f} MB\n"
-        f"📝 Name: `{getattr(file, 'file_name', 'file')}`",
+        f"📝 Name: `{upload_name(media, file) if file else 'file'}`",
         reply_markup=site_buttons(uid)
     )
 
@@ -224,7 +281,7 @@ async def callback_handler(bot, query: CallbackQuery):
             return await query.answer("⚠️ Already uploading", True)
         
         state["uploading"] = True
-        await query.message.edit("📥 Downloading...")
+        await query.message.edit("⚡ Starting upload...")
         
         asyncio.create_task(start_upload(bot, query.message, uid))
 
@@ -234,21 +291,25 @@ async def start_upload(bot, msg, uid):
     if not state:
         return
     
-    file_path = None
-    
     try:
         media = state["media"]
         site = state["site"]
         site_info = SITES_INFO[site]
         
-        # Download
-        file_path = await media.download()
-        if not file_path or not os.path.exists(file_path):
-            return await msg.edit("❌ Download failed")
+        file = getattr(media, media.media.value, None)
+        size = getattr(file, "file_size", 0)
+        if not size:
+            return await msg.edit("❌ Empty file")
         
-        # Upload
+        # Stream Telegram -> host (download and upload overlap)
         await msg.edit(f"⚡ Uploading to {site_info['name']}...")
-        link = await do_upload(file_path, site, msg)
+        upload = {
+            "media": media,
+            "size": size,
+            "name": upload_name(media, file),
+            "progress": Progress(size, msg)
+        }
+        link = await do_upload(upload, site)
         
         if not link:
             return await msg.edit(f"❌ Upload to {site_info['name']} failed")
@@ -270,11 +331,6 @@ async def start_upload(bot, msg, uid):
         await msg.edit(f"❌ Error: {str(e)[:100]}")
     
     finally:
-        if file_path and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except:
-                pass
         UPLOAD_STATE.pop(uid, None)
 
 # Cancel Command
@@ -0,0 +1,175 @@
+import logging
+
+# ==========================
+# 🔥 LOGGING CONFIG
+# ==========================
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    handlers=[logging.StreamHandler()]
+)
+
+logging.getLogger("hydrogram").setLevel(logging.ERROR)
+logging.getLogger("aiohttp.access").setLevel(logging.WARNING)
+logging.getLogger("aiohttp.server").setLevel(logging.WARNING)
+
+logger = logging.getLogger("XFILER.STREAM")
+
+# Crash-restart backoff: 1s, 2s, 4s ... capped; reset once a worker stays up
+RESTART_BACKOFF_MAX = 60
+RESTART_STABLE_AFTER = 120
+
+
+import os
+import time
+import signal
+import asyncio
+import uvloop
+
+from hydrogram import Client
+
+from web import start_web_server
+from web.utils.session_pool import media_pool
+from web.utils.render_template import build_static_pages
+from info import API_ID, API_HASH, BOT_TOKEN, PORT, STREAM_WORKERS, STREAM_ACCESS_LOG
+from utils import temp
+
+
+# ==========================
+# 📡 STREAM CLIENT
+# ==========================
+class StreamClient(Client):
+    """
+    Standalone web streamer (run next to `WEB_MODE=bot python bot.py`).
+    Own MTProto session, no plugins, no updates: it only reads BIN_CHANNEL
+    and serves /watch, /stream and /download.
+    """
+
+    def __init__(self, worker_id: int = 0):
+        self.worker_id = worker_id
+        super().__init__(
+            name=f"Auto_Filter_Stream_{worker_id}",
+            api_id=API_ID,
+            api_hash=API_HASH,
+            bot_token=BOT_TOKEN,
+            in_memory=True,
+            no_updates=True
+        )
+
+    async def start(self):
+        await super().start()
+
+        temp.START_TIME = time.time()
+        temp.BOT = self
+
+        me = await self.get_me()
+        temp.ME = me.id
+        temp.U_NAME = me.username
+        temp.B_NAME = me.first_name
+
+        build_static_pages()
+        await media_pool.start(self)
+        await start_web_server(PORT, reuse_port=STREAM_WORKERS > 1)
+
+        logger.info(f"Streamer #{self.worker_id} for @{me.username} listening on :{PORT}")
+
+    async def stop(self, *args):
+        await media_pool.stop()
+        await super().stop()
+        logger.info(f"Streamer #{self.worker_id} stopped cleanly")
+
+
+# ==========================
+# 🚀 ENTRYPOINT
+# ==========================
+async def main(worker_id: int = 0):
+    uvloop.install()
+    client = StreamClient(worker_id)
+    try:
+        await client.start()
+        await asyncio.Event().wait()
+    except (KeyboardInterrupt, SystemExit):
+        await client.stop()
+
+
+# ==========================
+# 👷 MULTI-WORKER SUPERVISOR
+# ==========================
+def run_worker(worker_id: int):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    asyncio.run(main(worker_id))
+
+
+def supervise(workers: int):
+    """
+    Fork `workers` streamers that share PORT through SO_REUSEPORT.
+    Each has its own hydrogram session and media sessions; chunk blocks are
+    shared through STREAM_DISK_CACHE_DIR. Crashed workers are restarted.
+    """
+    children = {}
+    started = {}
+    failures = {}
+    stopping = False
+
+    def spawn(worker_id: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(worker_id)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = worker_id
+        started[worker_id] = time.monotonic()
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for worker_id in range(workers):
+        spawn(worker_id)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    logger.info(f"✅ {workers} stream workers started on :{PORT}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        worker_id = children.pop(pid, None)
+        if worker_id is None or stopping:
+            continue
+
+        # Each restart logs in with the bot token again: back off on crash loops
+        if time.monotonic() - started[worker_id] > RESTART_STABLE_AFTER:
+            failures[worker_id] = 0
+        failures[worker_id] = failures.get(worker_id, 0) + 1
+        delay = min(RESTART_BACKOFF_MAX, 2 ** (failures[worker_id] - 1))
+
+        logger.warning(f"Streamer #{worker_id} exited ({status}), restarting in {delay}s")
+        time.sleep(delay)
+        if not stopping:
+            spawn(worker_id)
+
+
+if __name__ == "__main__":
+    if STREAM_ACCESS_LOG:
+        logging.getLogger("aiohttp.access").setLevel(logging.INFO)
+
+    if STREAM_WORKERS > 1:
+        supervise(STREAM_WORKERS)
+    else:
+        asyncio.run(main())
@@ -1,11 +1,14 @@
 import asyncio
 import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
+from hydrogram import enums
 from hydrogram.errors import FloodWait
 
-from info import ADMINS, IS_PREMIUM
+from info import ADMINS, IS_PREMIUM, CONTEXT_DEBUG
 from database.users_chats_db import db
+from database.entitlements import entitlements
 
 
 # ======================================================
@@ -19,11 +22,11 @@ class temp(object):
     U_NAME = None
     B_NAME = None
 
-    SETTINGS = {}
     FILES = {}          # msg_id -> delivery data
-    PREMIUM = {}        # RAM premium cache
     KEYWORDS = {}       # learned keywords (RAM)
-    BANNED_USERS = set()  # banned users set
+    BANNED_USERS = set()  # banned user ids (ban_registry.banned)
+    STREAM_LINKS = {}   # file _id -> BIN message id
+    CONTEXTS = OrderedDict()  # (chat_id, msg_id) -> UpdateContext
 
     INDEX_STATS = {
         "running": False,
@@ -39,77 +42,21 @@ class temp(object):
     _reminder_running = False
 
 
-# ======================================================
-# 👑 PREMIUM CONFIG (Synced with premium.py)
-# ======================================================
-
-GRACE_PERIOD = timedelta(minutes=30)
-PREMIUM_CACHE_TTL = 600  # 10 min cache
-
-
 # ======================================================
 # ⚡ ULTRA FAST PREMIUM CHECK (Required by premium.py)
 # ======================================================
 
 async def is_premium(user_id, bot=None) -> bool:
     """
-    Koyeb optimized premium check with extended cache
-    Returns True if user is premium, False otherwise
-    Synced with premium.py grace period logic
+    O(1) premium check against the in-memory entitlement store
+    Returns True if user is premium (grace period included), False otherwise
     ✅ REQUIRED BY PREMIUM.PY
     """
-    # Admins always have premium
-    if user_id in ADMINS:
-        return True
-    
     # If premium system is disabled, everyone has access
     if not IS_PREMIUM:
         return True
 
-    now_ts = time.time()
-    cached = temp.PREMIUM.get(user_id)
-
-    # Check cache first (10 min TTL)
-    if cached and now_ts - cached["checked_at"] < PREMIUM_CACHE_TTL:
-        expire = cached["expire"]
-        if expire:
-            return datetime.utcnow() <= expire + GRACE_PERIOD
-        return False
-
-    # Fetch from database
-    try:
-        plan = await db.get_plan(user_id)
-    except Exception as e:
-        print(f"[ERROR] is_premium DB error for user {user_id}: {e}")
-        # On error, return cached value if exists
-        if cached:
-            expire = cached["expire"]
-            return bool(expire and datetime.utcnow() <= expire + GRACE_PERIOD)
-        return False
-
-    # No plan or not premium
-    if not plan or not plan.get("premium"):
-        temp.PREMIUM[user_id] = {"expire": None, "checked_at": now_ts}
-        return False
-
-    # Get expiry date
-    expire = plan.get("expire")
-    if isinstance(expire, (int, float)):
-        expire = datetime.utcfromtimestamp(expire)
-    elif not isinstance(expire, datetime):
-        temp.PREMIUM[user_id] = {"expire": None, "checked_at": now_ts}
-        return False
-
-    # Check if expired (with grace period)
-    now_utc = datetime.utcnow()
-    if now_utc > expire + GRACE_PERIOD:
-        # Don't auto-remove here - let background task handle it
-        temp.PREMIUM[user_id] = {"expire": None, "checked_at": now_ts}
-        return False
-
-    # Cache and return
-    temp.PREMIUM[user_id] = {"expire": expire, "checked_at": now_ts}
-    return True
+    return entitlements.has_access(user_id)
 
 
 # ======================================================
@@ -162,17 +109,13 @@ async def premium_expiry_reminder(bot):
     while True:
         try:
             now = datetime.utcnow()
-            users = await db.get_premium_users()
-            
-            if not users:
-                await asyncio.sleep(1800)  # 30 min
-                continue
-            
             reminder_count = 0
             
-            for user in users:
+            # Only plans inside the widest reminder window (indexed range)
+            widest = max(delta for _, delta in REMINDER_STEPS)
+            async for user in db.iter_premium_users(after=now, before=now + widest):
                 try:
-                    uid = user.get("_id") or user.get("id")
+                    uid = user.get("id")
                     
                     if not uid or uid in ADMINS:
                         continue
@@ -181,13 +124,7 @@ async def premium_expiry_reminder(bot):
                     expire = plan.get("expire")
                     last = plan.get("last_reminder")
 
-                    if not expire:
-                        continue
-
-                    # Convert to datetime
-                    if isinstance(expire, (int, float)):
-                        expire = datetime.utcfromtimestamp(expire)
-                    elif not isinstance(expire, datetime):
+                    if not isinstance(expire, datetime):
                         continue
 
                     # Check each reminder step
@@ -207,8 +144,7 @@ async def premium_expiry_reminder(bot):
                                 )
                                 
                                 # Update last reminder
-                                plan["last_reminder"] = tag
-                                await db.update_plan(uid, plan)
+                                await db.set_last_reminder(uid, tag)
                                 
                                 reminder_count += 1
                                 print(f"[INFO] Sent {tag} reminder to user {uid}")
@@ -297,7 +233,7 @@ def suggest_query(query: str):
 async def cleanup_files_memory():
     """
     Koyeb optimized memory cleanup
-    Removes expired files and old premium cache
+    Removes expired files and trims learned keywords
     """
     if temp._cleanup_running:
         print("[INFO] Cleanup task already running, skipping...")
@@ -317,13 +253,6 @@ async def cleanup_files_memory():
                     temp.FILES.pop(k, None)
                 print(f"[INFO] Cleaned {len(expired)} expired files from memory")
             
-            # Cleanup old premium cache (keep only 1000 most recent)
-            if len(temp.PREMIUM) > 1000:
-                old_keys = list(temp.PREMIUM.keys())[:500]
-                for k in old_keys:
-                    temp.PREMIUM.pop(k, None)
-                print(f"[INFO] Cleaned {len(old_keys)} old premium cache entries")
-            
             # Cleanup keywords if too many
             if len(temp.KEYWORDS) > 10000:
                 sorted_kw = sorted(temp.KEYWORDS.items(), key=lambda x: x[1], reverse=True)
@@ -420,11 +349,119 @@ def get_readable_time(seconds):
 
 
 async def get_settings(group_id):
-    """Get group settings with caching"""
+    """Get group settings (TTL + LRU cache lives in db.get_settings)"""
     try:
-        if group_id not in temp.SETTINGS:
-            temp.SETTINGS[group_id] = await db.get_settings(group_id)
-        return temp.SETTINGS[group_id]
+        return await db.get_settings(group_id)
     except Exception as e:
         print(f"[ERROR] Get settings error for group {group_id}: {e}")
         return {}
+
+
+# ======================================================
+# 🧵 PER-UPDATE CONTEXT (SHARED BY ALL HANDLERS)
+# ======================================================
+
+CONTEXT_TTL = 60        # seconds an update context is kept
+MAX_CONTEXTS = 2000
+CONTEXT_STATS = {"updates": 0, "lookups": 0, "db_calls": 0, "api_calls": 0}
+
+
+class UpdateContext:
+    """
+    Settings, premium and admin status for one incoming message.
+    Each lookup runs at most once, however many handlers ask for it;
+    concurrent callers share the same in-flight task.
+    `db_calls` counts real round trips (settings cache misses), not lookups.
+    """
+
+    __slots__ = (
+        "chat_id", "msg_id", "user_id", "created", "tasks",
+        "lookups", "db_calls", "api_calls"
+    )
+
+    def __init__(self, message):
+        self.chat_id = message.chat.id
+        self.msg_id = message.id
+        self.user_id = message.from_user.id if message.from_user else None
+        self.created = time.time()
+        self.tasks = {}
+        self.lookups = 0
+        self.db_calls = 0
+        self.api_calls = 0
+
+    def _once(self, key, factory):
+        task = self.tasks.get(key)
+        if task is None:
+            task = self.tasks[key] = asyncio.ensure_future(factory())
+        return task
+
+    async def _load_settings(self):
+        self.lookups += 1
+        CONTEXT_STATS["lookups"] += 1
+        misses = db.settings_misses
+        settings = await db.get_settings(self.chat_id) or {}
+        if db.settings_misses > misses:
+            self.db_calls += 1
+            CONTEXT_STATS["db_calls"] += 1
+        return settings
+
+    async def _load_admin(self, client):
+        if self.user_id is None:
+            return False
+        self.api_calls += 1
+        CONTEXT_STATS["api_calls"] += 1
+        try:
+            member = await client.get_chat_member(self.chat_id, self.user_id)
+            return member.status in (
+                enums.ChatMemberStatus.ADMINISTRATOR,
+                enums.ChatMemberStatus.OWNER
+            )
+        except:
+            return False
+
+    async def settings(self) -> dict:
+        return await self._once("settings", self._load_settings)
+
+    async def premium(self) -> bool:
+        if self.user_id is None:
+            return False
+        return await self._once("premium", lambda: is_premium(self.user_id))
+
+    async def is_admin(self, client) -> bool:
+        return await self._once("admin", lambda: self._load_admin(client))
+
+    def summary(self) -> str:
+        return (
+            f"update {self.chat_id}:{self.msg_id} -> "
+            f"lookups={self.lookups} db={self.db_calls} api={self.api_calls}"
+        )
+
+
+def _drop_context(key):
+    ctx = temp.CONTEXTS.pop(key, None)
+    if ctx and CONTEXT_DEBUG:
+        print(f"[DEBUG] {ctx.summary()}")
+
+
+def finish_context(message):
+    """Called once every handler group has seen the update"""
+    _drop_context((message.chat.id, message.id))
+
+
+def get_context(message) -> UpdateContext:
+    """Context for this message, created by the first handler that asks"""
+    key = (message.chat.id, message.id)
+    ctx = temp.CONTEXTS.get(key)
+    if ctx:
+        return ctx
+
+    now = time.time()
+    while temp.CONTEXTS:
+        old_key, old = next(iter(temp.CONTEXTS.items()))
+        if len(temp.CONTEXTS) < MAX_CONTEXTS and now - old.created < CONTEXT_TTL:
+            break
+        _drop_context(old_key)
+
+    ctx = temp.CONTEXTS[key] = UpdateContext(message)
+    CONTEXT_STATS["updates"] += 1
+    return ctx
@@ -1,7 +1,8 @@
 # web/__init__.py
 
 from aiohttp import web
-from web.stream_routes import routes
+from web.stream_routes import routes, internal_prewarm_handler, status_handler, metrics_handler
+from info import STREAM_KEEPALIVE, STREAM_ACCESS_LOG, STREAM_SECRET
 
 
 # ======================================================
@@ -14,7 +15,44 @@ def create_app():
     # routes
     app.add_routes(routes)
 
+    # IPC and monitoring only exist with an explicit shared secret
+    # (send it as the X-Stream-Secret header)
+    if STREAM_SECRET:
+        app.router.add_post("/internal/prewarm/{message_id}", internal_prewarm_handler)
+        app.router.add_get("/status", status_handler)
+        app.router.add_get("/metrics", metrics_handler)
+
     return app
 
 
 web_app = create_app()
+
+
+# ======================================================
+# 🚀 WEB SERVER
+# ======================================================
+
+# Range streams are long-lived: log one short line per request, with the range
+ACCESS_LOG_FORMAT = '%a "%r" %s %b %Tf "%{Range}i"'
+
+
+async def start_web_server(port: int, reuse_port: bool = False):
+    runner_kwargs = {
+        "keepalive_timeout": STREAM_KEEPALIVE,
+        # cancel the handler (and its GetFile prefetch) when the client drops
+        "handler_cancellation": True,
+    }
+    if STREAM_ACCESS_LOG:
+        runner_kwargs["access_log_format"] = ACCESS_LOG_FORMAT
+    else:
+        runner_kwargs["access_log"] = None
+
+    runner = web.AppRunner(web_app, **runner_kwargs)
+    await runner.setup()
+    await web.TCPSite(
+        runner,
+        host="0.0.0.0",
+        port=port,
+        reuse_port=reuse_port or None
+    ).start()
+    return runner
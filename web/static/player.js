@@ -0,0 +1,107 @@
+/* Fast Finder player - play, progress, current time, fullscreen */
+(function () {
+  'use strict';
+
+  function fmt(sec) {
+    if (!isFinite(sec)) return '0:00';
+    sec = Math.floor(sec);
+    var h = Math.floor(sec / 3600);
+    var m = Math.floor((sec % 3600) / 60);
+    var s = ('0' + (sec % 60)).slice(-2);
+    return h ? h + ':' + ('0' + m).slice(-2) + ':' + s : m + ':' + s;
+  }
+
+  function el(tag, cls, attrs) {
+    var node = document.createElement(tag);
+    node.className = cls;
+    for (var k in attrs || {}) node.setAttribute(k, attrs[k]);
+    return node;
+  }
+
+  function setup(video) {
+    var box = el('div', 'fp');
+    video.parentNode.insertBefore(box, video);
+    box.appendChild(video);
+    video.removeAttribute('controls');
+
+    var bar = el('div', 'fp-bar');
+    var play = el('button', 'fp-btn', { type: 'button', 'aria-label': 'Play' });
+    var progress = el('input', 'fp-progress', {
+      type: 'range', min: 0, max: 1000, value: 0, step: 1, 'aria-label': 'Seek'
+    });
+    var time = el('span', 'fp-time');
+    var full = el('button', 'fp-btn', { type: 'button', 'aria-label': 'Fullscreen' });
+
+    play.textContent = '▶';
+    full.textContent = '⛶';
+    time.textContent = '0:00';
+
+    bar.appendChild(play);
+    bar.appendChild(progress);
+    bar.appendChild(time);
+    bar.appendChild(full);
+    box.appendChild(bar);
+
+    var seeking = false;
+    var idleTimer = null;
+
+    function toggle() {
+      if (video.paused) video.play(); else video.pause();
+    }
+
+    function wake() {
+      box.classList.remove('fp-idle');
+      clearTimeout(idleTimer);
+      idleTimer = setTimeout(function () { box.classList.add('fp-idle'); }, 2500);
+    }
+
+    play.addEventListener('click', toggle);
+    video.addEventListener('click', toggle);
+
+    video.addEventListener('play', function () {
+      box.classList.add('fp-playing');
+      play.textContent = '❚❚';
+      play.setAttribute('aria-label', 'Pause');
+      wake();
+    });
+
+    video.addEventListener('pause', function () {
+      box.classList.remove('fp-playing');
+      play.textContent = '▶';
+      play.setAttribute('aria-label', 'Play');
+    });
+
+    video.addEventListener('timeupdate', function () {
+      time.textContent = fmt(video.currentTime);
+      if (!seeking && video.duration) {
+        progress.value = Math.round(video.currentTime / video.duration * 1000);
+      }
+    });
+
+    progress.addEventListener('input', function () {
+      seeking = true;
+      if (video.duration) time.textContent = fmt(progress.value / 1000 * video.duration);
+    });
+
+    progress.addEventListener('change', function () {
+      if (video.duration) video.currentTime = progress.value / 1000 * video.duration;
+      seeking = false;
+    });
+
+    full.addEventListener('click', function () {
+      if (document.fullscreenElement) {
+        document.exitFullscreen();
+      } else if (box.requestFullscreen) {
+        box.requestFullscreen();
+      } else if (video.webkitEnterFullscreen) {
+        video.webkitEnterFullscreen();  // iOS Safari
+      }
+    });
+
+    box.addEventListener('mousemove', wake);
+    box.addEventListener('touchstart', wake, { passive: true });
+  }
+
+  var videos = document.querySelectorAll('video.player');
+  for (var i = 0; i < videos.length; i++) setup(videos[i]);
+})();
@@ -1,12 +1,36 @@
-import math
-import secrets
-import mimetypes
+import time
+import asyncio
+import logging
 
 from aiohttp import web
-from info import BIN_CHANNEL
-from utils import temp
-from web.utils.custom_dl import TGCustomYield, chunk_size, offset_fix
-from web.utils.render_template import media_watch
+from web.utils.custom_dl import TGCustomYield, prewarm_stream
+from web.utils.ipc import is_authorized
+from web.utils.media_meta import get_media_meta
+from web.utils.metrics import stream_metrics
+from web.utils.chunk_cache import chunk_cache
+from web.utils.planner import request_planner
+from database.users_chats_db import db
+from web.utils.scheduler import stream_scheduler, StreamRejected, client_ip
+from web.utils.render_template import get_root_page, get_watch_page, page_response
+from web.utils.static_assets import asset_response
+from web.utils.http_range import (
+    parse_range,
+    make_etag,
+    etag_matches,
+    http_date,
+    parse_http_date,
+    if_range_allows,
+    content_disposition,
+    multipart_boundary,
+    multipart_part_header,
+    multipart_trailer,
+    multipart_length
+)
+
+logger = logging.getLogger(__name__)
+
+# Telegram files behind a message id never change
+STREAM_CACHE_MAX_AGE = 86400
 
 routes = web.RouteTableDef()
 
@@ -16,86 +40,59 @@ routes = web.RouteTableDef()
 # ======================================================
 @routes.get("/", allow_head=True)
 async def root_route_handler(request):
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Search Files</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1">
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                background: #0f172a;
-                color: #e5e7eb;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                height: 100vh;
-                margin: 0;
-            }}
-            .box {{
-                background: #020617;
-                padding: 25px;
-                border-radius: 10px;
-                width: 100%;
-                max-width: 400px;
-                box-shadow: 0 0 15px rgba(0,0,0,0.6);
-            }}
-            h2 {{
-                text-align: center;
-                margin-bottom: 20px;
-            }}
-            input {{
-                width: 100%;
-                padding: 12px;
-                border-radius: 6px;
-                border: none;
-                outline: none;
-                margin-bottom: 12px;
-                font-size: 16px;
-            }}
-            button {{
-                width: 100%;
-                padding: 12px;
-                border-radius: 6px;
-                border: none;
-                background: #2563eb;
-                color: white;
-                font-size: 16px;
-                cursor: pointer;
-            }}
-            button:hover {{
-                background: #1d4ed8;
-            }}
-            .footer {{
-                margin-top: 15px;
-                text-align: center;
-                font-size: 12px;
-                opacity: 0.7;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="box">
-            <h2>🔎 Search Files</h2>
-            <input id="q" type="text" placeholder="Enter movie / series name">
-            <button onclick="go()">Search in Telegram</button>
-            <div class="footer">Service is running ✔️</div>
-        </div>
-
-        <script>
-            function go() {{
-                const q = document.getElementById("q").value.trim();
-                if (!q) return;
-                window.location.href =
-                    "https://t.me/{temp.U_NAME}?start=search_" +
-                    encodeURIComponent(q);
-            }}
-        </script>
-    </body>
-    </html>
-    """
-    return web.Response(text=html, content_type="text/html")
+    return page_response(request, get_root_page())
+
+
+# ======================================================
+# 🎨 STATIC ASSETS (SELF-HOSTED PLAYER)
+# ======================================================
+@routes.get("/static/{name}")
+async def static_handler(request):
+    return asset_response(request, request.match_info["name"])
+
+
+# ======================================================
+# 🔌 INTERNAL: PREWARM REQUEST FROM BOT PROCESS
+# ======================================================
+# Not in `routes`: create_app() mounts it only when STREAM_SECRET is set.
+async def internal_prewarm_handler(request):
+    if not is_authorized(request):
+        return web.Response(status=403)
+
+    try:
+        message_id = int(request.match_info["message_id"])
+    except ValueError:
+        return web.Response(status=400)
+
+    asyncio.create_task(prewarm_stream(message_id))
+    return web.Response(status=202)
+
+
+# ======================================================
+# 📊 STREAM STATUS (MONITORING)
+# ======================================================
+# Not in `routes` either: mounted with STREAM_SECRET and checked per request,
+# since they expose client counts, cache internals and Mongo timings.
+async def status_handler(request):
+    if not is_authorized(request):
+        return web.Response(status=403)
+    return web.json_response({"streams": stream_scheduler.stats()})
+
+
+# ======================================================
+# 📈 STREAM METRICS (TTFB, PER DC GETFILE, CACHE)
+# ======================================================
+async def metrics_handler(request):
+    if not is_authorized(request):
+        return web.Response(status=403)
+    snapshot = stream_metrics.snapshot(
+        cache=chunk_cache.stats(),
+        scheduler=stream_scheduler.stats(),
+        planner=request_planner.stats()
+    )
+    snapshot["db"] = db.latency_stats()
+    snapshot["db_cache"] = db.cache_stats()
+    return web.json_response(snapshot)
 
 
 # ======================================================
@@ -105,10 +102,14 @@ async def root_route_handler(request):
 async def watch_handler(request):
     try:
         message_id = int(request.match_info["message_id"])
-        return web.Response(
-            text=await media_watch(message_id),
-            content_type="text/html"
-        )
+        page = await get_watch_page(message_id)
+        if not page:
+            return web.Response(
+                status=404,
+                text="<h3>File not found</h3>",
+                content_type="text/html"
+            )
+        return page_response(request, page)
     except Exception:
         return web.Response(
             text="<h1>Something went wrong</h1>",
@@ -117,7 +118,7 @@ async def watch_handler(request):
 
 
 # ======================================================
-# ⬇️ DOWNLOAD ROUTE
+# ⬇️ DOWNLOAD ROUTE (ATTACHMENT)
 # ======================================================
 @routes.get("/download/{message_id}")
 async def download_handler(request):
@@ -131,56 +132,202 @@ async def download_handler(request):
         )
 
 
+# ======================================================
+# 📺 STREAM ROUTE (INLINE, USED BY /watch)
+# ======================================================
+@routes.get("/stream/{message_id}")
+async def stream_handler(request):
+    try:
+        message_id = int(request.match_info["message_id"])
+        return await media_download(request, message_id, inline=True)
+    except Exception:
+        return web.Response(
+            text="<h1>Something went wrong</h1>",
+            content_type="text/html"
+        )
+
+
 # ======================================================
 # 📦 MEDIA STREAM
 # ======================================================
-async def media_download(request, message_id: int):
-    range_header = request.headers.get("Range", None)
+async def media_download(request, message_id: int, inline: bool = False):
+    arrived = time.monotonic()
+    meta = await get_media_meta(message_id)
+    if not meta:
+        return web.Response(status=404, text="File not found")
+
+    file_size = meta["file_size"]
+    mime_type = meta["mime_type"]
+    etag = make_etag(meta["unique_id"], file_size)
+    last_modified = meta["last_modified"]
 
-    media_msg = await temp.BOT.get_messages(BIN_CHANNEL, message_id)
-    media = getattr(media_msg, media_msg.media.value, None)
-    file_size = media.file_size
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={STREAM_CACHE_MAX_AGE}",
+        "Content-Disposition": content_disposition(meta["file_name"], inline),
+    }
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
 
-    if range_header:
-        from_bytes, until_bytes = range_header.replace("bytes=", "").split("-")
-        from_bytes = int(from_bytes)
-        until_bytes = int(until_bytes) if until_bytes else file_size - 1
+    # ---- preconditions ----
+    if_match = request.headers.get("If-Match")
+    if if_match and not etag_matches(if_match, etag, weak=False):
+        return web.Response(status=412, headers=headers)
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        if etag_matches(if_none_match, etag):
+            return web.Response(status=304, headers=headers)
     else:
-        from_bytes = request.http_range.start or 0
-        until_bytes = request.http_range.stop or file_size - 1
-
-    req_length = until_bytes - from_bytes
-
-    new_chunk_size = await chunk_size(req_length)
-    offset = await offset_fix(from_bytes, new_chunk_size)
-    first_part_cut = from_bytes - offset
-    last_part_cut = (until_bytes % new_chunk_size) + 1
-    part_count = math.ceil(req_length / new_chunk_size)
-
-    body = TGCustomYield().yield_file(
-        media_msg,
-        offset,
-        first_part_cut,
-        last_part_cut,
-        part_count,
-        new_chunk_size
-    )
+        since = parse_http_date(request.headers.get("If-Modified-Since"))
+        if since and last_modified and last_modified <= since:
+            return web.Response(status=304, headers=headers)
 
-    file_name = media.file_name or f"{secrets.token_hex(2)}.bin"
-    mime_type = media.mime_type or mimetypes.guess_type(file_name)[0] or "application/octet-stream"
-
-    resp = web.Response(
-        status=206 if range_header else 200,
-        body=body,
-        headers={
-            "Content-Type": mime_type,
-            "Content-Range": f"bytes {from_bytes}-{until_bytes}/{file_size}",
-            "Content-Disposition": f'attachment; filename="{file_name}"',
-            "Accept-Ranges": "bytes",
-        }
-    )
+    # ---- range selection ----
+    ranges = None
+    if if_range_allows(request.headers.get("If-Range"), etag, last_modified):
+        ranges = parse_range(request.headers.get("Range"), file_size)
+
+    if ranges == []:
+        headers["Content-Range"] = f"bytes */{file_size}"
+        return web.Response(status=416, headers=headers)
+
+    streamer = TGCustomYield()
+    message = meta["message"]
+    span = None
+    body = None
+
+    # ---- full body ----
+    if not ranges:
+        status = 200
+        headers["Content-Type"] = mime_type
+        headers["Content-Length"] = str(file_size)
+        if file_size:
+            span = (0, file_size - 1)
+
+    # ---- single range ----
+    elif len(ranges) == 1:
+        status = 206
+        start, end = ranges[0]
+        headers["Content-Type"] = mime_type
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        headers["Content-Length"] = str(end - start + 1)
+        span = (start, end)
+
+    # ---- multiple ranges ----
+    else:
+        status = 206
+        boundary = multipart_boundary()
+        headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+        headers["Content-Length"] = str(
+            multipart_length(boundary, mime_type, ranges, file_size)
+        )
+        body = multipart_body(streamer, message, ranges, boundary, mime_type, file_size)
+
+    ip = client_ip(request)
+    ticket = None
+    if request.method == "HEAD":
+        if body is not None:
+            await body.aclose()
+        body = span = None
+    elif body is not None or span:
+        queued = time.monotonic()
+        try:
+            ticket = await stream_scheduler.acquire(ip)
+            stream_metrics.observe_queue_wait(time.monotonic() - queued)
+        except StreamRejected as e:
+            if body is not None:
+                await body.aclose()
+            return web.Response(
+                status=503,
+                text=f"Stream rejected: {e.reason}",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+
+    # ---- upstream plan (chunk size + prefetch from the access pattern) ----
+    access = None
+    if span:
+        start, end = span
+        plan, access = request_planner.plan(
+            ip, meta["unique_id"], start, end, open_ended=end == file_size - 1
+        )
+        body = streamer.yield_range(message, start, end, plan)
+
+    trace = stream_metrics.stream_started(meta["dc_id"], arrived) if body is not None else None
+    completed = False
+    try:
+        resp = web.StreamResponse(status=status, headers=headers)
+        await resp.prepare(request)
 
-    if resp.status == 200:
-        resp.headers["Content-Length"] = str(file_size)
+        completed = True
+        if body is not None:
+            completed = await send_body(
+                request, resp, body, ticket, trace, int(headers["Content-Length"])
+            )
+    finally:
+        if ticket:
+            stream_scheduler.release(ticket)
+        if trace:
+            trace.finish("completed" if completed else "aborted")
+        if access:
+            request_planner.done(access, span[0] + trace.bytes_sent, trace.bytes_sent)
 
+    if not completed:
+        # Short body: never let the connection be reused
+        resp.force_close()
+
+    try:
+        await resp.write_eof()
+    except ConnectionError:
+        pass
     return resp
+
+
+async def multipart_body(streamer, message, ranges, boundary, mime_type, file_size):
+    for start, end in ranges:
+        yield multipart_part_header(boundary, mime_type, start, end, file_size)
+
+        part = streamer.yield_range(message, start, end)
+        try:
+            async for chunk in part:
+                yield chunk
+        finally:
+            await part.aclose()
+
+    yield multipart_trailer(boundary)
+
+
+def client_gone(request) -> bool:
+    transport = request.transport
+    return transport is None or transport.is_closing()
+
+
+async def send_body(request, resp, body, ticket, trace, expected: int) -> bool:
+    """
+    Write chunks with backpressure (write() drains the transport).
+    Stops as soon as the client disconnects; closing the body cancels
+    every in-flight GetFile prefetch.
+    A body that ends before `expected` bytes (Content-Length) is a failure.
+    """
+    try:
+        async for chunk in body:
+            if client_gone(request):
+                return False
+            await stream_scheduler.throttle(ticket, len(chunk))
+            await resp.write(chunk)
+            trace.sent(len(chunk))
+
+        if trace.bytes_sent != expected:
+            logger.warning(f"Short stream body: {trace.bytes_sent}/{expected} bytes")
+            trace.finish("error")
+            return False
+        return True
+    except ConnectionError:
+        return False
+    except Exception as e:
+        logger.error(f"Stream aborted: {e}")
+        trace.finish("error")
+        return False
+    finally:
+        await body.aclose()
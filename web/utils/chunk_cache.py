@@ -0,0 +1,200 @@
+import os
+import asyncio
+import secrets
+from collections import OrderedDict
+
+from info import STREAM_CACHE_SIZE, STREAM_DISK_CACHE_DIR, STREAM_DISK_CACHE_SIZE
+
+
+# ======================================================
+# ⚙️ CONFIG
+# ======================================================
+
+BLOCK_SIZE = 1024 * 1024  # Telegram's max GetFile limit
+DISK_TRIM_EVERY = 64       # block writes between disk size checks
+
+
+# ======================================================
+# 💽 DISK TIER (SHARED BETWEEN WORKERS)
+# ======================================================
+
+class DiskBlockStore:
+    """
+    Flat directory of block files. Writes are atomic (tmp + rename) so
+    several worker processes can share one directory safely.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.writes = 0
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key) -> str:
+        media_id, block_index = key
+        return os.path.join(self.path, f"{media_id}_{block_index}.blk")
+
+    def read(self, key):
+        path = self._file(key)
+        try:
+            with open(path, "rb") as f:
+                block = f.read()
+            os.utime(path)  # keep hot blocks at the back of the trim order
+            return block
+        except OSError:
+            return None
+
+    def write(self, key, block: bytes):
+        final = self._file(key)
+        tmp = f"{final}.{secrets.token_hex(4)}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(block)
+            os.replace(tmp, final)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+
+        self.writes += 1
+        if self.writes % DISK_TRIM_EVERY == 0:
+            self.trim()
+
+    def trim(self):
+        """Drop least recently modified blocks until under the size cap"""
+        entries = []
+        total = 0
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if not entry.name.endswith(".blk"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+# ======================================================
+# 🧊 CHUNK CACHE (LRU, BYTE BOUNDED)
+# ======================================================
+
+class ChunkCache:
+    """
+    LRU cache of 1 MB file blocks keyed by (media_id, block_index).
+    Concurrent requests for the same block share one upstream fetch.
+    """
+
+    def __init__(self, max_bytes: int, disk: DiskBlockStore = None):
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self.blocks = OrderedDict()
+        self.size = 0
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def get(self, key):
+        block = self.blocks.get(key)
+        if block is not None:
+            self.blocks.move_to_end(key)
+        return block
+
+    def put(self, key, block: bytes):
+        if not block or len(block) > self.max_bytes:
+            return
+
+        old = self.blocks.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+
+        self.blocks[key] = block
+        self.size += len(block)
+
+        while self.size > self.max_bytes:
+            _, evicted = self.blocks.popitem(last=False)
+            self.size -= len(evicted)
+
+    def pending(self, key) -> bool:
+        return key in self.inflight
+
+    async def fetch(self, key, loader):
+        """Return the cached block or load it once, however many callers wait"""
+        block = self.get(key)
+        if block is not None:
+            self.hits += 1
+            return block
+
+        self.misses += 1
+        entry = self.inflight.get(key)
+        if not entry:
+            task = asyncio.ensure_future(self._load(key, loader))
+            entry = self.inflight[key] = [task, 0]
+            task.add_done_callback(lambda t: self._loaded(key, t))
+
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        except asyncio.CancelledError:
+            # Last waiter gone: nobody needs this block any more
+            if entry[1] == 1 and not entry[0].done():
+                entry[0].cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    async def _load(self, key, loader):
+        if self.disk:
+            block = await asyncio.to_thread(self.disk.read, key)
+            if block:
+                self.disk_hits += 1
+                return block
+
+        block = await loader()
+        if self.disk and block:
+            asyncio.create_task(asyncio.to_thread(self.disk.write, key, bytes(block)))
+        return block
+
+    def _loaded(self, key, task):
+        entry = self.inflight.get(key)
+        if entry and entry[0] is task:
+            self.inflight.pop(key, None)
+
+        if task.cancelled() or task.exception():
+            return
+        self.put(key, task.result())
+
+    def stats(self) -> dict:
+        return {
+            "blocks": len(self.blocks),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "disk": bool(self.disk),
+        }
+
+
+chunk_cache = ChunkCache(
+    STREAM_CACHE_SIZE * 1024 * 1024,
+    DiskBlockStore(STREAM_DISK_CACHE_DIR, STREAM_DISK_CACHE_SIZE * 1024 * 1024)
+    if STREAM_DISK_CACHE_DIR else None
+)
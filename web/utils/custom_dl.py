@@ -1,40 +1,36 @@
 import math
+import time
+import asyncio
+from collections import deque
 from typing import Union
 
+import aiofiles
 from hydrogram.types import Message
-from hydrogram import Client, utils, raw
-from hydrogram.session import Session, Auth
-from hydrogram.errors import AuthBytesInvalid
+from hydrogram import utils, raw
+from hydrogram.errors import FileReferenceExpired
 from hydrogram.file_id import FileId, FileType, ThumbnailSource
 
+from info import STREAM_PREFETCH_MAX
 from utils import temp
+from web.utils.session_pool import media_pool
+from web.utils.chunk_cache import chunk_cache, BLOCK_SIZE
+from web.utils.media_meta import get_media_meta, refresh_media_meta
+from web.utils.metrics import stream_metrics
+from web.utils.planner import RequestPlan, default_plan
 
 
-# ======================================================
-# ⚡ CHUNK HELPERS (SAFE)
-# ======================================================
+PREWARM_TAIL_MIN = 256 * 1024  # also warm the block before a tiny tail
+MAX_REFERENCE_REFRESH = 3      # per stream, guards against a refresh loop
 
-async def chunk_size(length: int) -> int:
-    """
-    Calculate optimal chunk size for streaming.
-    Safe for edge cases.
-    """
-    if length <= 0:
-        return 256 * 1024  # fallback 256KB
 
-    return (
-        2 ** max(
-            min(math.ceil(math.log2(length / 1024)), 10),
-            2
-        ) * 1024
-    )
-
-
-async def offset_fix(offset: int, chunksize: int) -> int:
-    """
-    Align offset to chunk boundary.
-    """
-    return offset - (offset % chunksize)
+def drop_tasks(tasks: deque):
+    """Cancel pending fetches and mark finished ones as retrieved"""
+    while tasks:
+        task = tasks.popleft()
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
 
 
 # ======================================================
@@ -57,65 +53,19 @@ class TGCustomYield:
         media = getattr(msg, msg.media.value, None)
         return FileId.decode(media.file_id)
 
-    # --------------------------------------------------
-    # 🌍 MEDIA SESSION (DC HANDLING)
-    # --------------------------------------------------
-    async def generate_media_session(self, client: Client, msg: Message) -> Session:
+    async def refresh_file_properties(self, msg: Message):
+        """
+        Re-fetch the message after FILE_REFERENCE_EXPIRED.
+        The fresh message goes back into the metadata cache for later requests.
+        """
+        meta = await refresh_media_meta(msg.id, msg.chat.id)
+        if not meta:
+            raise FileReferenceExpired
+
+        stream_metrics.reference_refreshes += 1
+        msg = meta["message"]
         data = await self.generate_file_properties(msg)
-
-        media_session = client.media_sessions.get(data.dc_id)
-
-        if media_session:
-            return media_session
-
-        # ---- DIFFERENT DC ----
-        if data.dc_id != await client.storage.dc_id():
-            media_session = Session(
-                client,
-                data.dc_id,
-                await Auth(
-                    client,
-                    data.dc_id,
-                    await client.storage.test_mode()
-                ).create(),
-                await client.storage.test_mode(),
-                is_media=True
-            )
-            await media_session.start()
-
-            for _ in range(3):
-                exported_auth = await client.invoke(
-                    raw.functions.auth.ExportAuthorization(
-                        dc_id=data.dc_id
-                    )
-                )
-                try:
-                    await media_session.send(
-                        raw.functions.auth.ImportAuthorization(
-                            id=exported_auth.id,
-                            bytes=exported_auth.bytes
-                        )
-                    )
-                    break
-                except AuthBytesInvalid:
-                    continue
-            else:
-                await media_session.stop()
-                raise AuthBytesInvalid
-
-        # ---- SAME DC ----
-        else:
-            media_session = Session(
-                client,
-                data.dc_id,
-                await client.storage.auth_key(),
-                await client.storage.test_mode(),
-                is_media=True
-            )
-            await media_session.start()
-
-        client.media_sessions[data.dc_id] = media_session
-        return media_session
+        return msg, data, await self.get_location(data)
 
     # --------------------------------------------------
     # 📍 FILE LOCATION
@@ -161,7 +111,85 @@ class TGCustomYield:
         )
 
     # --------------------------------------------------
-    # 🎬 STREAM FILE (RANGE SUPPORT)
+    # 📦 SINGLE CHUNK (CACHE AWARE)
+    # --------------------------------------------------
+    @staticmethod
+    async def get_file_part(dc_id: int, location, offset: int, limit: int) -> bytes:
+        started = time.monotonic()
+        try:
+            r = await media_pool.invoke(
+                dc_id,
+                raw.functions.upload.GetFile(
+                    location=location,
+                    offset=offset,
+                    limit=limit
+                )
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stream_metrics.observe_getfile(dc_id, time.monotonic() - started, 0, e)
+            raise
+
+        if not isinstance(r, raw.types.upload.File):
+            stream_metrics.observe_getfile(dc_id, time.monotonic() - started, 0)
+            return b""
+
+        stream_metrics.observe_getfile(dc_id, time.monotonic() - started, len(r.bytes))
+        return r.bytes
+
+    async def get_block(self, data: FileId, location, block_index: int) -> bytes:
+        return await chunk_cache.fetch(
+            (data.media_id, block_index),
+            lambda: self.get_file_part(
+                data.dc_id, location, block_index * BLOCK_SIZE, BLOCK_SIZE
+            )
+        )
+
+    async def get_chunk(self, data: FileId, location, offset: int, limit: int, cache: bool = True):
+        """
+        Full blocks, and anything inside a cached/in-flight block, go through
+        the chunk cache. Small cold reads hit Telegram directly.
+        With cache=False, cached blocks are still used but nothing is stored.
+        """
+        block_index, inner = divmod(offset, BLOCK_SIZE)
+        key = (data.media_id, block_index)
+
+        if not cache:
+            block = chunk_cache.get(key)
+            if block is not None:
+                return memoryview(block)[inner:inner + limit]
+        elif limit == BLOCK_SIZE or chunk_cache.get(key) is not None or chunk_cache.pending(key):
+            block = await self.get_block(data, location, block_index)
+            return memoryview(block)[inner:inner + limit]
+
+        return await self.get_file_part(data.dc_id, location, offset, limit)
+
+    # --------------------------------------------------
+    # 🔥 HEAD / TAIL PREWARM
+    # --------------------------------------------------
+    async def prewarm(self, media_msg: Message):
+        """Pull the first and last blocks (MP4 moov atom) into the chunk cache"""
+        media = getattr(media_msg, media_msg.media.value, None)
+        file_size = getattr(media, "file_size", 0) or 0
+        if not file_size:
+            return
+
+        data = await self.generate_file_properties(media_msg)
+        location = await self.get_location(data)
+
+        last_block = (file_size - 1) // BLOCK_SIZE
+        blocks = {0, last_block}
+        if last_block and file_size - last_block * BLOCK_SIZE < PREWARM_TAIL_MIN:
+            blocks.add(last_block - 1)
+
+        await asyncio.gather(
+            *(self.get_block(data, location, i) for i in blocks),
+            return_exceptions=True
+        )
+
+    # --------------------------------------------------
+    # 🎬 STREAM FILE (RANGE SUPPORT + PREFETCH)
     # --------------------------------------------------
     async def yield_file(
         self,
@@ -170,78 +198,159 @@ class TGCustomYield:
         first_part_cut: int,
         last_part_cut: int,
         part_count: int,
-        chunk_size: int
+        chunk_size: int,
+        prefetch: int,
+        ramp: bool = False,
+        cache: bool = True
     ):
-        client = self.main_bot
+        """
+        Yield the requested parts while up to `prefetch` GetFile calls run ahead.
+        With `ramp` the read-ahead grows by one per consumed part instead.
+        Closing the generator cancels every in-flight fetch.
+        """
         data = await self.generate_file_properties(media_msg)
-        media_session = await self.generate_media_session(client, media_msg)
         location = await self.get_location(data)
 
+        pending = deque()
+        next_part = 1
         current_part = 1
+        refreshes = 0
+
+        def schedule():
+            nonlocal next_part
+            depth = min(prefetch, current_part - 1) if ramp else prefetch
+            while next_part <= part_count and len(pending) <= depth:
+                pending.append(asyncio.ensure_future(
+                    self.get_chunk(
+                        data,
+                        location,
+                        offset + (next_part - 1) * chunk_size,
+                        chunk_size,
+                        cache
+                    )
+                ))
+                next_part += 1
 
-        r = await media_session.send(
-            raw.functions.upload.GetFile(
-                location=location,
-                offset=offset,
-                limit=chunk_size
-            )
-        )
+        try:
+            schedule()
 
-        if not isinstance(r, raw.types.upload.File):
-            return
+            while pending:
+                try:
+                    chunk = await pending.popleft()
+                except FileReferenceExpired:
+                    if refreshes >= MAX_REFERENCE_REFRESH:
+                        raise
+                    refreshes += 1
+
+                    # New reference, then refetch from the part the client is waiting on
+                    drop_tasks(pending)
+                    media_msg, data, location = await self.refresh_file_properties(media_msg)
+                    next_part = current_part
+                    schedule()
+                    continue
 
-        while current_part <= part_count:
-            chunk = r.bytes
-            if not chunk:
-                break
+                schedule()
 
-            offset += chunk_size
+                if not chunk:
+                    break
 
-            if part_count == 1:
-                yield chunk[first_part_cut:last_part_cut]
-                break
+                # memoryview slices share the GetFile buffer (no copy)
+                view = memoryview(chunk)
 
-            if current_part == 1:
-                yield chunk[first_part_cut:]
-            else:
-                yield chunk
+                if part_count == 1:
+                    yield view[first_part_cut:last_part_cut]
+                    break
 
-            r = await media_session.send(
-                raw.functions.upload.GetFile(
-                    location=location,
-                    offset=offset,
-                    limit=chunk_size
-                )
-            )
+                if current_part == 1:
+                    yield view[first_part_cut:]
+                elif current_part == part_count:
+                    yield view[:last_part_cut]
+                    break
+                else:
+                    yield view
 
-            current_part += 1
+                current_part += 1
+
+        finally:
+            drop_tasks(pending)
 
     # --------------------------------------------------
-    # 📥 FULL DOWNLOAD (BYTES)
+    # ✂️ STREAM BYTE RANGE (INCLUSIVE)
     # --------------------------------------------------
-    async def download_as_bytesio(self, media_msg: Message):
-        client = self.main_bot
-        data = await self.generate_file_properties(media_msg)
-        media_session = await self.generate_media_session(client, media_msg)
-        location = await self.get_location(data)
+    async def yield_range(self, media_msg: Message, start: int, end: int, plan: RequestPlan = None):
+        plan = plan or default_plan(start, end)
+        chunk = plan.chunk_size
+        offset = start - (start % chunk)
+        first_part_cut = start - offset
+        last_part_cut = (end % chunk) + 1
+        part_count = math.ceil((end + 1) / chunk) - offset // chunk
+
+        parts = self.yield_file(
+            media_msg,
+            offset,
+            first_part_cut,
+            last_part_cut,
+            part_count,
+            chunk,
+            plan.prefetch,
+            plan.ramp,
+            plan.cache
+        )
+        try:
+            async for chunk in parts:
+                yield chunk
+        finally:
+            await parts.aclose()
 
-        limit = 1024 * 1024
-        offset = 0
-        result = []
+    # --------------------------------------------------
+    # 📥 FULL DOWNLOAD (STREAMED)
+    # --------------------------------------------------
+    async def iter_file(self, media_msg: Message, cache: bool = True):
+        """Yield the whole file as memoryview chunks, a few MB in flight at most"""
+        media = getattr(media_msg, media_msg.media.value, None)
+        file_size = getattr(media, "file_size", 0) or 0
+        if not file_size:
+            return
 
-        while True:
-            r = await media_session.send(
-                raw.functions.upload.GetFile(
-                    location=location,
-                    offset=offset,
-                    limit=limit
-                )
-            )
+        chunks = self.yield_range(
+            media_msg,
+            0,
+            file_size - 1,
+            RequestPlan("sequential", BLOCK_SIZE, STREAM_PREFETCH_MAX, cache=cache)
+        )
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def download_to(self, media_msg: Message, write) -> int:
+        """
+        Stream the whole file into `write` (sync or async callable).
+        Returns the number of bytes written.
+        """
+        written = 0
+        async for chunk in self.iter_file(media_msg):
+            res = write(chunk)
+            if asyncio.iscoroutine(res):
+                await res
+            written += len(chunk)
+        return written
+
+    async def download_to_file(self, media_msg: Message, path: str) -> int:
+        async with aiofiles.open(path, "wb") as f:
+            return await self.download_to(media_msg, f.write)
 
-            if not isinstance(r, raw.types.upload.File) or not r.bytes:
-                break
 
-            result.append(r.bytes)
-            offset += limit
+# ======================================================
+# 🔥 PREWARM BY BIN MESSAGE ID
+# ======================================================
 
-        return result
+async def prewarm_stream(message_id: int):
+    """Warm metadata + head/tail blocks right after stream links are handed out"""
+    try:
+        meta = await get_media_meta(message_id)
+        if meta:
+            await TGCustomYield().prewarm(meta["message"])
+    except Exception as e:
+        print(f"[WARN] Stream prewarm failed for {message_id}: {e}")
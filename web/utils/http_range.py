@@ -0,0 +1,192 @@
+import re
+import secrets
+import urllib.parse
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+
+# ======================================================
+# 📐 RANGE PARSER (RFC 9110 §14)
+# ======================================================
+
+RANGE_SPEC = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+MAX_RANGES = 8  # more than this is treated as abuse -> full response
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a Range header into sorted, coalesced (start, end) pairs (inclusive).
+    Returns None when the header should be ignored, [] when unsatisfiable.
+    """
+    if not header:
+        return None
+
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        m = RANGE_SPEC.match(part)
+        if not m:
+            return None
+
+        first, last = m.groups()
+        if not first and not last:
+            return None
+
+        if not first:
+            # suffix range: last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            ranges.append((max(0, size - length), size - 1))
+            continue
+
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and end < start:
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+# ======================================================
+# 🏷 VALIDATORS
+# ======================================================
+
+def make_etag(unique_id: str, size: int) -> str:
+    return f'"{unique_id}-{size}"'
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """Compare an If-Match / If-None-Match style list against our etag"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    for tag in header.split(","):
+        tag = tag.strip()
+        if weak and tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def pick_encoding(accept: Optional[str], available) -> Optional[str]:
+    """
+    Best coding from `available` (in server preference order) for an
+    Accept-Encoding header: honours q-values, q=0 and `*`.
+    """
+    if not accept:
+        return None
+
+    weights = {}
+    for item in accept.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for enc in available:
+        q = weights.get(enc, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """Distinct strong ETag per content coding (RFC 9110 8.8.3)"""
+    if not encoding:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def http_date(dt) -> str:
+    return format_datetime(dt, usegmt=True)
+
+
+def parse_http_date(value: Optional[str]):
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def if_range_allows(header: Optional[str], etag: str, last_modified) -> bool:
+    """True when the Range header may be honoured under If-Range"""
+    if not header:
+        return True
+
+    header = header.strip()
+    if header.startswith('"') or header.startswith("W/"):
+        # If-Range needs a strong comparison
+        return header == etag
+
+    since = parse_http_date(header)
+    return bool(since and last_modified and since == last_modified)
+
+
+# ======================================================
+# 📎 HEADERS
+# ======================================================
+
+def content_disposition(file_name: str, inline: bool = False) -> str:
+    kind = "inline" if inline else "attachment"
+    ascii_name = file_name.encode("ascii", "ignore").decode() or "file"
+    ascii_name = ascii_name.replace('"', "")
+    quoted = urllib.parse.quote(file_name)
+    return f"{kind}; filename=\"{ascii_name}\"; filename*=UTF-8''{quoted}"
+
+
+def multipart_boundary() -> str:
+    return secrets.token_hex(12)
+
+
+def multipart_part_header(boundary: str, mime_type: str, start: int, end: int, size: int) -> bytes:
+    return (
+        f"\r\n--{boundary}\r\n"
+        f"Content-Type: {mime_type}\r\n"
+        f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+    ).encode()
+
+
+def multipart_trailer(boundary: str) -> bytes:
+    return f"\r\n--{boundary}--\r\n".encode()
+
+
+def multipart_length(boundary: str, mime_type: str, ranges, size: int) -> int:
+    total = len(multipart_trailer(boundary))
+    for start, end in ranges:
+        total += len(multipart_part_header(boundary, mime_type, start, end, size))
+        total += end - start + 1
+    return total
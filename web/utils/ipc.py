@@ -0,0 +1,54 @@
+import hmac
+
+import aiohttp
+
+from info import WEB_MODE, STREAM_INTERNAL_URL, STREAM_SECRET
+from web.utils.custom_dl import prewarm_stream
+
+
+# ======================================================
+# 🔌 BOT -> STREAMER CHANNEL (WEB_MODE=bot)
+# ======================================================
+
+SECRET_HEADER = "X-Stream-Secret"
+IPC_TIMEOUT = aiohttp.ClientTimeout(total=5)
+
+_session = None
+
+
+def is_authorized(request) -> bool:
+    if not STREAM_SECRET:
+        return False
+    given = request.headers.get(SECRET_HEADER, "")
+    return hmac.compare_digest(given.encode(), STREAM_SECRET.encode())
+
+
+def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            timeout=IPC_TIMEOUT,
+            headers={SECRET_HEADER: STREAM_SECRET}
+        )
+    return _session
+
+
+async def notify_prewarm(message_id: int) -> bool:
+    """Ask the streamer process to warm a BIN message (fire and forget)"""
+    try:
+        async with get_session().post(
+            f"{STREAM_INTERNAL_URL}internal/prewarm/{message_id}"
+        ) as r:
+            return r.status == 202
+    except Exception as e:
+        print(f"[WARN] Streamer prewarm IPC failed for {message_id}: {e}")
+        return False
+
+
+async def request_prewarm(message_id: int):
+    """Prewarm locally or through the streamer, depending on WEB_MODE"""
+    if WEB_MODE == "bot":
+        await notify_prewarm(message_id)
+        return
+
+    await prewarm_stream(message_id)
@@ -0,0 +1,83 @@
+import time
+import mimetypes
+from datetime import timezone
+from typing import Dict, Optional, Tuple
+
+from hydrogram.file_id import FileId
+
+from info import BIN_CHANNEL
+from utils import temp
+
+
+# ======================================================
+# 🗂 MEDIA METADATA CACHE
+# ======================================================
+
+META_CACHE: Dict[Tuple[int, int], Tuple[dict, float]] = {}
+META_TTL = 3600  # seconds
+MAX_META_CACHE = 5000
+
+
+def build_meta(msg) -> Optional[dict]:
+    """Extract everything the stream layer needs from a message"""
+    if not msg or not msg.media:
+        return None
+
+    media = getattr(msg, msg.media.value, None)
+    if not media or not getattr(media, "file_id", None):
+        return None
+
+    file_name = getattr(media, "file_name", None) or f"{media.file_unique_id}.bin"
+    mime_type = (
+        getattr(media, "mime_type", None)
+        or mimetypes.guess_type(file_name)[0]
+        or "application/octet-stream"
+    )
+
+    last_modified = None
+    if msg.date:
+        last_modified = msg.date.astimezone(timezone.utc).replace(microsecond=0)
+
+    return {
+        "message": msg,
+        "file_name": file_name,
+        "mime_type": mime_type,
+        "file_size": getattr(media, "file_size", 0) or 0,
+        "unique_id": media.file_unique_id,
+        "dc_id": FileId.decode(media.file_id).dc_id,
+        "last_modified": last_modified,
+    }
+
+
+def meta_set(chat_id: int, message_id: int, meta: dict) -> None:
+    if len(META_CACHE) >= MAX_META_CACHE:
+        oldest = min(META_CACHE.items(), key=lambda x: x[1][1])
+        META_CACHE.pop(oldest[0], None)
+
+    META_CACHE[(chat_id, message_id)] = (meta, time.time())
+
+
+def meta_drop(chat_id: int, message_id: int) -> None:
+    META_CACHE.pop((chat_id, message_id), None)
+
+
+async def get_media_meta(message_id: int, chat_id: int = BIN_CHANNEL) -> Optional[dict]:
+    """Get cached media metadata, fetching the message once per TTL"""
+    key = (chat_id, message_id)
+    cached = META_CACHE.get(key)
+    if cached and time.time() - cached[1] < META_TTL:
+        return cached[0]
+
+    return await refresh_media_meta(message_id, chat_id)
+
+
+async def refresh_media_meta(message_id: int, chat_id: int = BIN_CHANNEL) -> Optional[dict]:
+    """Fetch the message again (fresh file_reference) and replace the cached entry"""
+    msg = await temp.BOT.get_messages(chat_id, message_id)
+    meta = build_meta(msg)
+    if meta:
+        meta_set(chat_id, message_id, meta)
+    else:
+        meta_drop(chat_id, message_id)
+
+    return meta
@@ -0,0 +1,218 @@
+import time
+from collections import defaultdict
+
+
+# ======================================================
+# ⚙️ CONFIG
+# ======================================================
+
+# Upper bounds in milliseconds; the last bucket is open ended
+LATENCY_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+# ======================================================
+# 📈 HISTOGRAM
+# ======================================================
+
+class Histogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float):
+        i = 0
+        while i < len(LATENCY_BUCKETS) and ms > LATENCY_BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q: float) -> float:
+        """Bucket upper bound containing the q-th observation"""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(float(LATENCY_BUCKETS[i]), self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 1) if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max, 1),
+            "buckets": dict(zip(
+                [str(b) for b in LATENCY_BUCKETS] + ["+inf"],
+                self.counts
+            )),
+        }
+
+
+# ======================================================
+# 🛰 PER DC COUNTERS
+# ======================================================
+
+class DCStats:
+    __slots__ = ("calls", "errors", "flood_waits", "bytes_fetched", "bytes_served", "latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.flood_waits = 0
+        self.bytes_fetched = 0
+        self.bytes_served = 0
+        self.latency = Histogram()
+
+    def snapshot(self) -> dict:
+        return {
+            "getfile_calls": self.calls,
+            "getfile_errors": self.errors,
+            "flood_waits": self.flood_waits,
+            "bytes_fetched": self.bytes_fetched,
+            "bytes_served": self.bytes_served,
+            "getfile_latency": self.latency.snapshot(),
+        }
+
+
+# ======================================================
+# 🎬 PER REQUEST TRACE
+# ======================================================
+
+class StreamTrace:
+    """
+    Tracks one /stream or /download response from handler entry to EOF.
+    `started` is the request's arrival, so TTFB includes the message
+    lookup and the admission queue.
+    """
+
+    __slots__ = ("registry", "dc_id", "started", "first_byte", "bytes_sent", "done")
+
+    def __init__(self, registry, dc_id: int, started: float = None):
+        self.registry = registry
+        self.dc_id = dc_id
+        self.started = started or time.monotonic()
+        self.first_byte = None
+        self.bytes_sent = 0
+        self.done = False
+
+    def sent(self, nbytes: int):
+        if self.first_byte is None:
+            self.first_byte = time.monotonic()
+            self.registry.ttfb.observe((self.first_byte - self.started) * 1000)
+        self.bytes_sent += nbytes
+
+    def finish(self, outcome: str):
+        """outcome: completed | aborted | error"""
+        if self.done:
+            return
+        self.done = True
+        self.registry._finish(self, outcome)
+
+
+# ======================================================
+# 📊 STREAM METRICS REGISTRY
+# ======================================================
+
+class StreamMetrics:
+    """
+    In-process counters for the stream path.
+    Cheap enough to update on every GetFile and every response.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.ttfb = Histogram()
+        self.queue_wait = Histogram()
+        self.dcs = defaultdict(DCStats)
+        self.requests = 0
+        self.active = 0
+        self.outcomes = {"completed": 0, "aborted": 0, "error": 0}
+        self.bytes_served = 0
+        self.reference_refreshes = 0
+
+    # --------------------------------------------------
+    # 🛰 UPSTREAM (TELEGRAM)
+    # --------------------------------------------------
+    def observe_getfile(self, dc_id: int, seconds: float, nbytes: int, error: Exception = None):
+        dc = self.dcs[dc_id]
+        dc.calls += 1
+        dc.latency.observe(seconds * 1000)
+
+        if error is None:
+            dc.bytes_fetched += nbytes
+            return
+
+        dc.errors += 1
+        if type(error).__name__ == "FloodWait":
+            dc.flood_waits += 1
+
+    # --------------------------------------------------
+    # 🎬 DOWNSTREAM (CLIENTS)
+    # --------------------------------------------------
+    def stream_started(self, dc_id: int, started: float = None) -> StreamTrace:
+        """`started`: time.monotonic() at handler entry"""
+        self.requests += 1
+        self.active += 1
+        return StreamTrace(self, dc_id, started)
+
+    def observe_queue_wait(self, seconds: float):
+        self.queue_wait.observe(seconds * 1000)
+
+    def _finish(self, trace: StreamTrace, outcome: str):
+        self.active -= 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.bytes_served += trace.bytes_sent
+        self.dcs[trace.dc_id].bytes_served += trace.bytes_sent
+
+    # --------------------------------------------------
+    # 📤 EXPORT
+    # --------------------------------------------------
+    def snapshot(self, cache: dict = None, scheduler: dict = None, planner: dict = None) -> dict:
+        finished = sum(self.outcomes.values())
+        out = {
+            "uptime": int(time.time() - self.started_at),
+            "streams": {
+                "requests": self.requests,
+                "active": self.active,
+                **self.outcomes,
+                "abort_rate": round(self.outcomes["aborted"] / finished, 4) if finished else 0.0,
+                "bytes_served": self.bytes_served,
+                "reference_refreshes": self.reference_refreshes,
+                "ttfb": self.ttfb.snapshot(),
+                "queue_wait": self.queue_wait.snapshot(),
+            },
+            "dcs": {str(dc_id): dc.snapshot() for dc_id, dc in sorted(self.dcs.items())},
+        }
+
+        if cache is not None:
+            lookups = cache.get("hits", 0) + cache.get("misses", 0)
+            out["cache"] = {
+                **cache,
+                "hit_ratio": round(cache.get("hits", 0) / lookups, 4) if lookups else 0.0,
+            }
+
+        if scheduler is not None:
+            out["scheduler"] = scheduler
+
+        if planner is not None:
+            out["planner"] = planner
+
+        return out
+
+
+stream_metrics = StreamMetrics()
@@ -0,0 +1,174 @@
+import time
+from collections import OrderedDict
+
+from info import STREAM_PREFETCH, STREAM_PREFETCH_MAX
+from web.utils.chunk_cache import BLOCK_SIZE
+
+
+# ======================================================
+# ⚙️ CONFIG
+# ======================================================
+
+MIN_CHUNK = 4 * 1024           # GetFile offset/limit granularity
+PROBE_MAX = 64 * 1024          # bounded ranges up to this size are probes
+SEQUENTIAL_SLACK = BLOCK_SIZE  # resume within 1 MB of the last position = same read
+RAMP_BYTES = 8 * BLOCK_SIZE    # sequential bytes before the deepest prefetch
+STATE_TTL = 300                # seconds an idle client/file state is kept
+MAX_STATES = 10000
+
+
+# ======================================================
+# 🧭 PLAN + ACCESS STATE
+# ======================================================
+
+class RequestPlan:
+    """
+    How one byte range is fetched upstream.
+    `ramp` starts with a single GetFile in flight and deepens the prefetch
+    by one per consumed chunk, so an aborted probe costs one fetch only.
+    `cache=False` keeps one-off reads (uploads) out of the chunk cache.
+    """
+
+    __slots__ = ("pattern", "chunk_size", "prefetch", "ramp", "cache")
+
+    def __init__(
+        self,
+        pattern: str,
+        chunk_size: int,
+        prefetch: int,
+        ramp: bool = False,
+        cache: bool = True
+    ):
+        self.pattern = pattern
+        self.chunk_size = chunk_size
+        self.prefetch = prefetch
+        self.ramp = ramp
+        self.cache = cache
+
+
+class AccessState:
+    """What a single client has been doing with a single file"""
+
+    __slots__ = ("position", "streamed", "active", "seen")
+
+    def __init__(self):
+        self.position = None
+        self.streamed = 0
+        self.active = 0
+        self.seen = time.monotonic()
+
+
+# ======================================================
+# ⚡ CHUNK HELPERS
+# ======================================================
+
+def pow2_chunk(length: int) -> int:
+    """Smallest power-of-two chunk (4 KB..1 MB) covering `length` bytes"""
+    size = MIN_CHUNK
+    while size < length and size < BLOCK_SIZE:
+        size *= 2
+    return size
+
+
+def probe_chunk(start: int, end: int) -> int:
+    """Smallest aligned chunk that serves [start, end] in a single GetFile"""
+    size = pow2_chunk(end - start + 1)
+    candidate = size
+    while candidate <= PROBE_MAX:
+        if start // candidate == end // candidate:
+            return candidate
+        candidate *= 2
+    return size
+
+
+def default_plan(start: int, end: int) -> RequestPlan:
+    """Plan from the requested length alone (multipart parts, internal reads)"""
+    length = end - start + 1
+    if length <= PROBE_MAX:
+        return RequestPlan("probe", probe_chunk(start, end), 0)
+
+    chunk = pow2_chunk(length)
+    parts = (end // chunk) - (start // chunk) + 1
+    return RequestPlan("range", chunk, min(STREAM_PREFETCH, parts - 1))
+
+
+# ======================================================
+# 🧠 REQUEST PLANNER
+# ======================================================
+
+class RequestPlanner:
+    """
+    Picks chunk size and prefetch depth from how a client reads a file:
+    - probe:      small bounded range (container headers, seek index)
+    - sequential: open-ended or continuing playback, 1 MB chunks, deepening prefetch
+    - segment:    download manager pulling several bounded ranges in parallel
+    - range:      any other bounded read, sized from its length
+    """
+
+    def __init__(self):
+        self.states = OrderedDict()
+        self.counters = {"probe": 0, "sequential": 0, "segment": 0, "range": 0}
+
+    def _state(self, key) -> AccessState:
+        now = time.monotonic()
+        state = self.states.pop(key, None)
+        if state is None or (not state.active and now - state.seen > STATE_TTL):
+            state = AccessState()
+        state.seen = now
+        self.states[key] = state
+
+        while len(self.states) > MAX_STATES:
+            old_key, old = next(iter(self.states.items()))
+            if old.active:
+                self.states.move_to_end(old_key)
+                break
+            self.states.popitem(last=False)
+
+        return state
+
+    def plan(self, client: str, media_key, start: int, end: int, open_ended: bool):
+        state = self._state((client, media_key))
+        length = end - start + 1
+        continuing = (
+            state.position is not None
+            and abs(start - state.position) <= SEQUENTIAL_SLACK
+        )
+
+        if not open_ended and length <= PROBE_MAX:
+            plan = RequestPlan("probe", probe_chunk(start, end), 0)
+
+        elif continuing:
+            deep = state.streamed >= RAMP_BYTES
+            plan = RequestPlan(
+                "sequential", BLOCK_SIZE, STREAM_PREFETCH_MAX if deep else STREAM_PREFETCH
+            )
+
+        elif not open_ended and state.active:
+            # Parallel segments: the client already supplies the concurrency
+            plan = RequestPlan("segment", BLOCK_SIZE, 1)
+
+        elif not open_ended:
+            plan = default_plan(start, end)
+
+        else:
+            # Fresh open-ended read: players often abort it right after the headers
+            state.streamed = 0
+            plan = RequestPlan("sequential", BLOCK_SIZE, STREAM_PREFETCH_MAX, ramp=True)
+
+        state.active += 1
+        self.counters[plan.pattern] += 1
+        return plan, state
+
+    def done(self, state: AccessState, position: int, nbytes: int):
+        """Record where the client stopped reading"""
+        state.active = max(0, state.active - 1)
+        state.seen = time.monotonic()
+        if nbytes:
+            state.position = position
+            state.streamed += nbytes
+
+    def stats(self) -> dict:
+        return {"tracked": len(self.states), **self.counters}
+
+
+request_planner = RequestPlanner()
@@ -1,6 +1,105 @@
-from info import BIN_CHANNEL, URL
-from utils import temp
+import gzip
+import hashlib
 import urllib.parse, html
+from collections import OrderedDict
+
+from aiohttp import web
+
+from info import URL
+from utils import temp
+from web.utils.media_meta import get_media_meta
+from web.utils.http_range import etag_matches, pick_encoding, encoded_etag
+from web.utils.static_assets import asset_url
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# ======================================================
+# 🌐 ROOT + SEARCH TEMPLATE
+# ======================================================
+
+ROOT_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <title>Search Files</title>
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <style>
+        body {{
+            font-family: Arial, sans-serif;
+            background: #0f172a;
+            color: #e5e7eb;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            height: 100vh;
+            margin: 0;
+        }}
+        .box {{
+            background: #020617;
+            padding: 25px;
+            border-radius: 10px;
+            width: 100%;
+            max-width: 400px;
+            box-shadow: 0 0 15px rgba(0,0,0,0.6);
+        }}
+        h2 {{
+            text-align: center;
+            margin-bottom: 20px;
+        }}
+        input {{
+            width: 100%;
+            padding: 12px;
+            border-radius: 6px;
+            border: none;
+            outline: none;
+            margin-bottom: 12px;
+            font-size: 16px;
+        }}
+        button {{
+            width: 100%;
+            padding: 12px;
+            border-radius: 6px;
+            border: none;
+            background: #2563eb;
+            color: white;
+            font-size: 16px;
+            cursor: pointer;
+        }}
+        button:hover {{
+            background: #1d4ed8;
+        }}
+        .footer {{
+            margin-top: 15px;
+            text-align: center;
+            font-size: 12px;
+            opacity: 0.7;
+        }}
+    </style>
+</head>
+<body>
+    <div class="box">
+        <h2>🔎 Search Files</h2>
+        <input id="q" type="text" placeholder="Enter movie / series name">
+        <button onclick="go()">Search in Telegram</button>
+        <div class="footer">Service is running ✔️</div>
+    </div>
+
+    <script>
+        function go() {{
+            const q = document.getElementById("q").value.trim();
+            if (!q) return;
+            window.location.href =
+                "https://t.me/{bot_username}?start=search_" +
+                encodeURIComponent(q);
+        }}
+    </script>
+</body>
+</html>
+"""
+
 
 # ======================================================
 # ⚡ ULTRA FAST WATCH TEMPLATE (MINIMAL)
@@ -13,7 +112,7 @@ WATCH_HTML = """<!DOCTYPE html>
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
 <title>{title}</title>
 
-<link rel="stylesheet" href="https://cdn.plyr.io/3.7.8/plyr.css">
+<link rel="stylesheet" href="{player_css}">
 
 <style>
 :root {{
@@ -103,7 +202,7 @@ footer {{
 <div class="container">
 
   <div class="player-box">
-    <video class="player" controls playsinline src="{src}"></video>
+    <video class="player" controls playsinline preload="metadata" src="{src}"></video>
   </div>
 
   <div class="file-name">{file_name}</div>
@@ -114,13 +213,13 @@ footer {{
     <div class="tag">NO ADS</div>
   </div>
 
-  <a class="download-btn" href="{src}" download>⬇ Direct Download</a>
+  <a class="download-btn" href="{download}" download>⬇ Direct Download</a>
 
 </div>
 
 <footer>© 2025 Fast Finder Bot</footer>
 
-<script src="https://cdn.plyr.io/3.7.8/plyr.js"></script>
+<script src="{player_js}" defer></script>
 
 <script>
 /* ---- Ultra light Telegram theme sync (ONE TIME) ---- */
@@ -132,11 +231,6 @@ footer {{
   if (t.bg_color) r.style.setProperty('--bg', t.bg_color);
   if (t.text_color) r.style.setProperty('--text', t.text_color);
 }})();
-
-/* ---- Plyr init (minimal controls) ---- */
-new Plyr('.player', {{
-  controls: ['play','progress','current-time','fullscreen']
-}});
 </script>
 
 </body>
@@ -145,22 +239,113 @@ new Plyr('.player', {{
 
 
 # ======================================================
-# 🎬 WATCH HANDLER
+# 🗜 PRE-RENDERED PAGES (COMPRESSED ONCE)
+# ======================================================
+
+ROOT_MAX_AGE = 300
+WATCH_MAX_AGE = 3600
+MAX_WATCH_PAGES = 1000
+
+ROOT_PAGE = {}
+WATCH_PAGES = OrderedDict()
+
+
+class RenderedPage:
+    """A finished HTML page with its gzip/brotli bodies and ETag"""
+
+    def __init__(self, text: str, max_age: int):
+        self.body = text.encode()
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        self.max_age = max_age
+        self.encoded = {"gzip": gzip.compress(self.body, 9)}
+        if brotli:
+            self.encoded["br"] = brotli.compress(self.body)
+
+
+def page_response(request, page: RenderedPage):
+    enc = pick_encoding(
+        request.headers.get("Accept-Encoding"),
+        [e for e in ("br", "gzip") if e in page.encoded]
+    )
+    headers = {
+        "ETag": encoded_etag(page.etag, enc),
+        "Cache-Control": f"public, max-age={page.max_age}",
+        "Vary": "Accept-Encoding",
+    }
+
+    if etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+        return web.Response(status=304, headers=headers)
+
+    if enc:
+        headers["Content-Encoding"] = enc
+        body = page.encoded[enc]
+    else:
+        body = page.body
+
+    return web.Response(
+        body=body,
+        headers=headers,
+        content_type="text/html",
+        charset="utf-8"
+    )
+
+
+# ======================================================
+# 🌐 ROOT PAGE (BUILT ONCE)
+# ======================================================
+
+def build_static_pages():
+    """Render pages that only depend on the bot identity (call after get_me)"""
+    ROOT_PAGE["page"] = RenderedPage(
+        ROOT_HTML.format(bot_username=temp.U_NAME),
+        ROOT_MAX_AGE
+    )
+
+
+def get_root_page() -> RenderedPage:
+    if "page" not in ROOT_PAGE:
+        build_static_pages()
+    return ROOT_PAGE["page"]
+
+
+# ======================================================
+# 🎬 WATCH PAGE (CACHED PER MESSAGE)
 # ======================================================
 
 async def media_watch(message_id: int):
-    msg = await temp.BOT.get_messages(BIN_CHANNEL, message_id)
-    media = getattr(msg, msg.media.value, None)
+    meta = await get_media_meta(message_id)
 
-    if not media:
-        return "<h3>File not found</h3>"
+    if not meta:
+        return None
 
-    src = urllib.parse.urljoin(URL, f"download/{message_id}")
-    title = html.escape(f"Watch - {media.file_name}")
-    name = html.escape(media.file_name)
+    src = urllib.parse.urljoin(URL, f"stream/{message_id}")
+    download = urllib.parse.urljoin(URL, f"download/{message_id}")
+    title = html.escape(f"Watch - {meta['file_name']}")
+    name = html.escape(meta["file_name"])
 
     return WATCH_HTML.format(
         title=title,
         file_name=name,
-        src=src
+        src=src,
+        download=download,
+        player_css=asset_url("player.css"),
+        player_js=asset_url("player.js")
     )
+
+
+async def get_watch_page(message_id: int):
+    page = WATCH_PAGES.get(message_id)
+    if page:
+        WATCH_PAGES.move_to_end(message_id)
+        return page
+
+    text = await media_watch(message_id)
+    if not text:
+        return None
+
+    page = RenderedPage(text, WATCH_MAX_AGE)
+    WATCH_PAGES[message_id] = page
+    if len(WATCH_PAGES) > MAX_WATCH_PAGES:
+        WATCH_PAGES.popitem(last=False)
+
+    return page
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+
+from info import (
+    STREAM_MAX_ACTIVE,
+    STREAM_MAX_PER_IP,
+    STREAM_QUEUE_SIZE,
+    STREAM_QUEUE_TIMEOUT,
+    STREAM_BANDWIDTH,
+    STREAM_TRUST_PROXY,
+    STREAM_PROXY_HOPS
+)
+
+
+# ======================================================
+# 🚦 STREAM ADMISSION CONTROL
+# ======================================================
+
+class StreamRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class StreamTicket:
+    __slots__ = ("ip", "admitted_at", "next_at")
+
+    def __init__(self, ip: str):
+        self.ip = ip
+        self.admitted_at = time.monotonic()
+        self.next_at = self.admitted_at
+
+
+def client_ip(request) -> str:
+    """
+    Peer address, or (behind STREAM_PROXY_HOPS trusted proxies) the entry
+    our own outermost proxy appended. Entries left of it are client supplied.
+    """
+    if STREAM_TRUST_PROXY and STREAM_PROXY_HOPS > 0:
+        forwarded = [
+            ip.strip() for ip in request.headers.get("X-Forwarded-For", "").split(",")
+            if ip.strip()
+        ]
+        if len(forwarded) >= STREAM_PROXY_HOPS:
+            return forwarded[-STREAM_PROXY_HOPS]
+    return request.remote or "unknown"
+
+
+class StreamScheduler:
+    """
+    Global + per-IP concurrency limits with a bounded FIFO wait queue.
+    Bandwidth (if capped) is split evenly between active streams.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.per_ip = defaultdict(int)
+        self.waiters = deque()
+        self.stats_counters = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected_ip": 0,
+            "rejected_full": 0,
+            "rejected_timeout": 0,
+        }
+
+    # --------------------------------------------------
+    # 🎟 ADMISSION
+    # --------------------------------------------------
+    async def acquire(self, ip: str) -> StreamTicket:
+        if STREAM_MAX_PER_IP and self.per_ip[ip] >= STREAM_MAX_PER_IP:
+            self.stats_counters["rejected_ip"] += 1
+            raise StreamRejected("too many streams from this client", 5)
+
+        # Reserve the per-IP slot while waiting, so one client can't flood the queue
+        self.per_ip[ip] += 1
+        try:
+            if self.active >= STREAM_MAX_ACTIVE:
+                await self._wait_turn()
+        except BaseException:
+            self._release_ip(ip)
+            raise
+
+        self.active += 1
+        self.stats_counters["admitted"] += 1
+        return StreamTicket(ip)
+
+    async def _wait_turn(self):
+        if len(self.waiters) >= STREAM_QUEUE_SIZE:
+            self.stats_counters["rejected_full"] += 1
+            raise StreamRejected("server busy", STREAM_QUEUE_TIMEOUT)
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        self.stats_counters["queued"] += 1
+
+        try:
+            await asyncio.wait_for(fut, STREAM_QUEUE_TIMEOUT)
+        except BaseException as e:
+            if fut in self.waiters:
+                self.waiters.remove(fut)
+            # Timed out / cancelled (client gone) right after release()
+            # handed us its slot: pass it on instead of leaking it
+            if fut.done() and not fut.cancelled():
+                self._pass_slot()
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats_counters["rejected_timeout"] += 1
+                raise StreamRejected("server busy", STREAM_QUEUE_TIMEOUT)
+            raise
+
+        # release() handed its slot over to us; acquire() counts it again
+        self.active -= 1
+
+    def release(self, ticket: StreamTicket):
+        self._release_ip(ticket.ip)
+        self._pass_slot()
+
+    def _pass_slot(self):
+        """Hand one active slot to the oldest live waiter, or free it"""
+        while self.waiters:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                # active stays unchanged: the waiter now owns the slot
+                fut.set_result(True)
+                return
+
+        self.active -= 1
+
+    def _release_ip(self, ip: str):
+        self.per_ip[ip] -= 1
+        if self.per_ip[ip] <= 0:
+            self.per_ip.pop(ip, None)
+
+    # --------------------------------------------------
+    # ⚖️ FAIR BANDWIDTH
+    # --------------------------------------------------
+    async def throttle(self, ticket: StreamTicket, nbytes: int):
+        if STREAM_BANDWIDTH <= 0:
+            return
+
+        rate = STREAM_BANDWIDTH / max(1, self.active)
+        now = time.monotonic()
+        ticket.next_at = max(ticket.next_at, now) + nbytes / rate
+
+        delay = ticket.next_at - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    # --------------------------------------------------
+    # 📊 MONITORING
+    # --------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queue_depth": len(self.waiters),
+            "clients": len(self.per_ip),
+            "limits": {
+                "max_active": STREAM_MAX_ACTIVE,
+                "max_per_ip": STREAM_MAX_PER_IP,
+                "queue_size": STREAM_QUEUE_SIZE,
+                "bandwidth": STREAM_BANDWIDTH,
+            },
+            **self.stats_counters,
+        }
+
+
+stream_scheduler = StreamScheduler()
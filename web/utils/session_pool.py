@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import secrets
+from collections import defaultdict
+
+from hydrogram import Client, raw
+from hydrogram.session import Session, Auth
+from hydrogram.errors import AuthBytesInvalid
+
+from info import STREAM_DC_CONCURRENCY, STREAM_HEALTH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# ⚙️ CONFIG
+# ======================================================
+
+PROD_DCS = (1, 2, 3, 4, 5)
+TEST_DCS = (1, 2, 3)
+PROBE_TIMEOUT = 10  # seconds
+PROBE_FAILURES = 3  # consecutive failed probes before a rebuild
+RETIRE_TIMEOUT = 120  # max seconds an old session waits for in-flight calls
+
+
+# ======================================================
+# 🌍 MEDIA SESSION POOL (PER DC)
+# ======================================================
+
+class MediaSessionPool:
+    """
+    Pre-warmed media sessions for every DC.
+    Caps concurrent GetFile calls per DC and rebuilds dead sessions.
+    A rebuilt session is swapped in first; the old one is stopped only
+    after its in-flight calls drain.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.sessions = {}
+        self.locks = defaultdict(asyncio.Lock)
+        self.limits = {}
+        self.inflight = defaultdict(int)   # session -> calls in progress
+        self.failures = defaultdict(int)   # dc_id -> consecutive failed probes
+        self._health_task = None
+
+    # --------------------------------------------------
+    # 🚀 START / STOP
+    # --------------------------------------------------
+    def attach(self, client: Client):
+        """Bind the client only; sessions then open lazily on first use"""
+        self.client = client
+
+    async def start(self, client: Client):
+        self.attach(client)
+        await self.warm_all()
+
+        if not self._health_task:
+            self._health_task = asyncio.create_task(self.health_worker())
+
+    async def stop(self):
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+
+        for dc_id in list(self.sessions):
+            await self._drop(dc_id)
+
+    async def warm_all(self):
+        """Open a session to every known DC in parallel"""
+        test_mode = await self.client.storage.test_mode()
+        dcs = TEST_DCS if test_mode else PROD_DCS
+
+        results = await asyncio.gather(
+            *(self.get(dc_id) for dc_id in dcs),
+            return_exceptions=True
+        )
+
+        for dc_id, res in zip(dcs, results):
+            if isinstance(res, Exception):
+                logger.warning(f"DC{dc_id} warmup failed: {res}")
+
+        logger.info(f"✅ Media sessions warmed: {sorted(self.sessions)}")
+
+    # --------------------------------------------------
+    # 🔌 SESSION ACCESS
+    # --------------------------------------------------
+    async def get(self, dc_id: int) -> Session:
+        session = self.sessions.get(dc_id)
+        if session:
+            return session
+
+        async with self.locks[dc_id]:
+            session = self.sessions.get(dc_id)
+            if session:
+                return session
+
+            # Reuse a session hydrogram already opened for this DC
+            session = self.client.media_sessions.get(dc_id)
+            if not session:
+                session = await self._create(dc_id)
+
+            self.sessions[dc_id] = session
+            self.client.media_sessions[dc_id] = session
+            return session
+
+    def limiter(self, dc_id: int) -> asyncio.Semaphore:
+        if dc_id not in self.limits:
+            self.limits[dc_id] = asyncio.Semaphore(STREAM_DC_CONCURRENCY)
+        return self.limits[dc_id]
+
+    async def invoke(self, dc_id: int, query, retry: bool = True):
+        """
+        Send a request on the DC media session within its concurrency cap.
+        A connection error on a dead session rebuilds it and retries once.
+        """
+        session = await self.get(dc_id)
+        async with self.limiter(dc_id):
+            self.inflight[session] += 1
+            try:
+                return await session.send(query)
+            except (OSError, ConnectionError) as e:
+                dead = not isinstance(e, TimeoutError) or self._is_dead(session)
+                if not (retry and dead):
+                    raise
+                logger.warning(f"DC{dc_id} send failed on a dead session: {e}")
+            finally:
+                self.inflight[session] -= 1
+                if not self.inflight[session]:
+                    del self.inflight[session]
+
+        await self.rebuild(dc_id, stale=session)
+        return await self.invoke(dc_id, query, retry=False)
+
+    @staticmethod
+    def _is_dead(session: Session) -> bool:
+        started = getattr(session, "is_started", None)
+        return started is not None and not started.is_set()
+
+    # --------------------------------------------------
+    # 🛠 BUILD / DROP
+    # --------------------------------------------------
+    async def _create(self, dc_id: int) -> Session:
+        client = self.client
+        test_mode = await client.storage.test_mode()
+
+        # ---- SAME DC ----
+        if dc_id == await client.storage.dc_id():
+            session = Session(
+                client,
+                dc_id,
+                await client.storage.auth_key(),
+                test_mode,
+                is_media=True
+            )
+            await session.start()
+            return session
+
+        # ---- DIFFERENT DC ----
+        session = Session(
+            client,
+            dc_id,
+            await Auth(client, dc_id, test_mode).create(),
+            test_mode,
+            is_media=True
+        )
+        await session.start()
+
+        for _ in range(3):
+            exported_auth = await client.invoke(
+                raw.functions.auth.ExportAuthorization(dc_id=dc_id)
+            )
+            try:
+                await session.send(
+                    raw.functions.auth.ImportAuthorization(
+                        id=exported_auth.id,
+                        bytes=exported_auth.bytes
+                    )
+                )
+                return session
+            except AuthBytesInvalid:
+                continue
+
+        await session.stop()
+        raise AuthBytesInvalid
+
+    async def _drop(self, dc_id: int):
+        session = self.sessions.pop(dc_id, None)
+        if self.client and self.client.media_sessions.get(dc_id) is session:
+            self.client.media_sessions.pop(dc_id, None)
+
+        if session:
+            try:
+                await session.stop()
+            except Exception:
+                pass
+
+    async def _retire(self, dc_id: int, session: Session):
+        """Stop a replaced session once its in-flight calls have finished"""
+        waited = 0.0
+        while self.inflight.get(session) and waited < RETIRE_TIMEOUT:
+            await asyncio.sleep(0.5)
+            waited += 0.5
+
+        try:
+            await session.stop()
+        except Exception:
+            pass
+        logger.info(f"DC{dc_id} old media session stopped after {waited:.0f}s")
+
+    async def rebuild(self, dc_id: int, stale: Session = None):
+        """
+        Swap in a fresh session for `dc_id`.
+        With `stale`, do nothing if that session was already replaced.
+        """
+        async with self.locks[dc_id]:
+            old = self.sessions.get(dc_id)
+            if stale is not None and old is not stale:
+                return
+
+            session = await self._create(dc_id)
+            self.sessions[dc_id] = session
+            self.client.media_sessions[dc_id] = session
+            self.failures.pop(dc_id, None)
+
+        if old:
+            asyncio.create_task(self._retire(dc_id, old))
+        logger.info(f"♻️ Media session DC{dc_id} rebuilt")
+
+    # --------------------------------------------------
+    # ❤️ HEALTH CHECKS
+    # --------------------------------------------------
+    async def probe(self, dc_id: int) -> bool:
+        session = self.sessions.get(dc_id)
+        if not session:
+            return False
+
+        try:
+            await asyncio.wait_for(
+                session.send(raw.functions.Ping(ping_id=secrets.randbits(63))),
+                PROBE_TIMEOUT
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"DC{dc_id} health probe failed: {e}")
+            return False
+
+    async def health_worker(self):
+        while True:
+            await asyncio.sleep(STREAM_HEALTH_INTERVAL)
+
+            for dc_id in list(self.sessions):
+                if await self.probe(dc_id):
+                    self.failures.pop(dc_id, None)
+                    continue
+
+                # A slow Ping under heavy load is not a dead session
+                self.failures[dc_id] += 1
+                if self.failures[dc_id] < PROBE_FAILURES:
+                    continue
+
+                try:
+                    await self.rebuild(dc_id, stale=self.sessions.get(dc_id))
+                except Exception as e:
+                    logger.error(f"DC{dc_id} rebuild failed: {e}")
+
+
+media_pool = MediaSessionPool()
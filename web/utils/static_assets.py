@@ -0,0 +1,89 @@
+import os
+import gzip
+import hashlib
+import mimetypes
+import urllib.parse
+
+from aiohttp import web
+
+from info import URL
+from web.utils.http_range import etag_matches, pick_encoding, encoded_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# ======================================================
+# 📦 BUNDLED STATIC ASSETS (CONTENT HASHED)
+# ======================================================
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+ASSETS = {}     # hashed name -> asset
+MANIFEST = {}   # plain name -> hashed name
+
+
+class StaticAsset:
+    def __init__(self, name: str, body: bytes):
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+
+        self.name = f"{stem}.{digest}{ext}"
+        self.body = body
+        self.etag = f'"{digest}"'
+        self.content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.encoded = {"gzip": gzip.compress(body, 9)}
+        if brotli:
+            self.encoded["br"] = brotli.compress(body)
+
+
+def load_assets():
+    ASSETS.clear()
+    MANIFEST.clear()
+
+    for name in sorted(os.listdir(STATIC_DIR)):
+        path = os.path.join(STATIC_DIR, name)
+        if not os.path.isfile(path):
+            continue
+
+        with open(path, "rb") as f:
+            asset = StaticAsset(name, f.read())
+
+        ASSETS[asset.name] = asset
+        MANIFEST[name] = asset.name
+
+
+def asset_url(name: str) -> str:
+    return urllib.parse.urljoin(URL, f"static/{MANIFEST[name]}")
+
+
+def asset_response(request, name: str):
+    asset = ASSETS.get(name)
+    if not asset:
+        return web.Response(status=404, text="Not found")
+
+    enc = pick_encoding(
+        request.headers.get("Accept-Encoding"),
+        [e for e in ("br", "gzip") if e in asset.encoded]
+    )
+    headers = {
+        "ETag": encoded_etag(asset.etag, enc),
+        "Cache-Control": IMMUTABLE,
+        "Vary": "Accept-Encoding",
+    }
+
+    if etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+        return web.Response(status=304, headers=headers)
+
+    body = asset.body
+    if enc:
+        headers["Content-Encoding"] = enc
+        body = asset.encoded[enc]
+
+    return web.Response(body=body, headers=headers, content_type=asset.content_type)
+
+
+load_assets()